@@ -1,6 +1,16 @@
-from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends
-from app.db.dependencies import get_db
+from app.db.database import engine, async_engine
+from app.db.pool import pool_status
+from app.services.principal import Principal, principal_cache
+from app.services.dependencies import get_admin_user
+from app.services.message_writer import message_writer
+from app.services.response_cache import response_cache
+from app.services.passwords import password_hasher
+from app.config.limiter import limiter
+from app.services.leaderboard import leaderboards
+from app.services.avatars import avatar_store
+from app.services import badges
+from app.core import log_config
 from app.admin import logs
 
 
@@ -11,20 +21,50 @@ router.include_router(logs.router)
 def admin_home():
     return {"message": "Welcome to the admin panel! (Basic placeholder)"}
 
-#@router.post("/setup-default-badges/")
-#def setup_default_badges(db: Session = Depends(get_db)):
-#    default_badges = [
- #       {"name": "First 100 XP", "description": "You reached 100 XP!", "icon": "🏅"},
-#        {"name": "Chatterbox", "description": "You’ve sent 50 messages!", "icon": "💬"},
-#        {"name": "Level Up!", "description": "You reached your first new level!", "icon": "📈"},
-#    ]
-#
-#    created = 0
-#    for badge_data in default_badges:
-#        exists = db.query(Badge).filter(Badge.name == badge_data["name"]).first()
-#        if not exists:
-#            db.add(Badge(**badge_data))
-#            created += 1
-#
-#    db.commit()
-#    return {"message": f"{created} badges added successfully."}
\ No newline at end of file
+@router.get("/admin/db/pool-stats")
+def get_pool_stats(admin_user: Principal = Depends(get_admin_user)):
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine),
+    }
+
+@router.get("/admin/message-writer/stats")
+def get_message_writer_stats(admin_user: Principal = Depends(get_admin_user)):
+    return message_writer.stats()
+
+@router.get("/admin/response-cache/stats")
+def get_response_cache_stats(admin_user: Principal = Depends(get_admin_user)):
+    return response_cache.stats()
+
+@router.get("/admin/principal-cache/stats")
+def get_principal_cache_stats(admin_user: Principal = Depends(get_admin_user)):
+    return principal_cache.stats()
+
+@router.get("/admin/password-hasher/stats")
+def get_password_hasher_stats(admin_user: Principal = Depends(get_admin_user)):
+    return password_hasher.stats()
+
+@router.get("/admin/rate-limiter/stats")
+def get_rate_limiter_stats(admin_user: Principal = Depends(get_admin_user)):
+    return limiter.stats()
+
+@router.get("/admin/leaderboards/stats")
+def get_leaderboard_stats(admin_user: Principal = Depends(get_admin_user)):
+    return leaderboards.stats()
+
+@router.get("/admin/avatars/stats")
+def get_avatar_stats(admin_user: Principal = Depends(get_admin_user)):
+    return avatar_store.stats()
+
+@router.get("/admin/logging/stats")
+def get_logging_stats(admin_user: Principal = Depends(get_admin_user)):
+    return log_config.stats()
+
+@router.get("/admin/badges/stats")
+def get_badge_stats(admin_user: Principal = Depends(get_admin_user)):
+    return badges.stats()
+
+@router.post("/setup-default-badges/")
+async def setup_default_badges(admin_user: Principal = Depends(get_admin_user)):
+    created = await badges.ensure_default_badges()
+    return {"message": f"{created} badges added successfully."}
@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
-import json
-from app.api.auth_routes import get_current_user
-from app.models.user import User
+from app.services.principal import Principal, get_current_principal
+from app.services.log_reader import APP_LOG, LOG_QUERY_MAX_LIMIT, CursorExpired
 
 router = APIRouter()
 
 @router.get("/admin/logs")
-def get_logs(current_user: User = Depends(get_current_user)):
+def get_logs(
+    level: Optional[str] = Query(None, description="Minimum level, e.g. WARNING"),
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=LOG_QUERY_MAX_LIMIT),
+    current_user: Principal = Depends(get_current_principal),
+):
     if not current_user.is_admin:
         return JSONResponse(status_code=403, content={"detail": "Not authorized"})
 
-    logs = []
+    # Newest first; pass next_cursor back to get older entries
     try:
-        with open("logs/app.log", "r") as f:
-            for line in f:
-                try:
-                    logs.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-    except FileNotFoundError:
-        return []
+        page = APP_LOG.query(level=level, user_id=user_id, since=since, until=until, cursor=cursor, limit=limit)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return logs
+    return {
+        "entries": [record.data for record in page.records],
+        "next_cursor": page.next_cursor,
+    }
@@ -1,53 +1,65 @@
 # app/api/admin_analytics_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import PlainTextResponse
+from datetime import datetime
+from typing import Optional
 from sqlalchemy.orm import Session
-from app.db.dependencies import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dependencies import get_db, get_async_db
 from app.models.user import User
 from app.models.conversation import ChatSession
 from app.models.conversation import ConversationHistory
 from app.services.dependencies import get_admin_user
+from app.services.principal import Principal
 from app.schemas.log_entry import LogEntry
 from app.services.admin_auth import verify_admin_user
+from app.services.platform_counters import get_totals, get_daily_rollups, reconcile_counters
+from app.services.leaderboard import BOARDS, get_top, rebuild as rebuild_leaderboard
+from app.services.log_reader import TITLE_LOG, LOG_QUERY_MAX_LIMIT, CursorExpired
 import os
 
 
 
 router = APIRouter(prefix="/admin/analytics", tags=["Admin Analytics"])
 
-LOG_PATH = "logs/title_generation.log"
-
 
 @router.get("/basic-stats")
-def get_basic_stats(db: Session = Depends(get_db)):
-    total_users = db.query(User).count()
-    total_chat_sessions = db.query(ChatSession).count()
-    total_messages = db.query(ConversationHistory).count()
+async def get_basic_stats(db: AsyncSession = Depends(get_async_db)):
+    # Maintained counters (app/services/platform_counters.py), not COUNT(*) scans
+    totals = await get_totals(db)
 
     return {
-        "total_users": total_users,
-        "total_chat_sessions": total_chat_sessions,
-        "total_messages": total_messages
+        "total_users": totals["users"],
+        "total_chat_sessions": totals["chat_sessions"],
+        "total_messages": totals["messages"]
     }
 
-@router.get("/top-users")
-def get_top_users_by_message_count(db: Session = Depends(get_db), limit: int = 5):
-    from sqlalchemy import func
+@router.get("/daily-stats")
+async def get_daily_stats(
+    days: int = Query(30, ge=1, le=366),
+    admin_user: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Users, chat sessions and messages created per UTC day
+    return await get_daily_rollups(db, days)
 
-    results = (
-        db.query(User.id, User.username, func.count(ConversationHistory.id).label("message_count"))
-        .join(ConversationHistory, ConversationHistory.user_id == User.id)
-        .group_by(User.id)
-        .order_by(func.count(ConversationHistory.id).desc())
-        .limit(limit)
-        .all()
-    )
+@router.post("/reconcile-counters")
+async def reconcile_platform_counters(admin_user: Principal = Depends(get_admin_user)):
+    return {"corrections": await reconcile_counters()}
 
-    return [{"user_id": r.id, "username": r.username, "message_count": r.message_count} for r in results]
+@router.get("/top-users")
+async def get_top_users_by_message_count(limit: int = 5):
+    # Served from the all-time messages leaderboard (app/services/leaderboard.py)
+    entries = await get_top("messages", "all", limit)
+    return [{"user_id": e["user_id"], "username": e["username"], "message_count": e["score"]} for e in entries]
+
+@router.post("/leaderboards/rebuild")
+async def rebuild_leaderboards(admin_user: Principal = Depends(get_admin_user)):
+    return {board: await rebuild_leaderboard(board) for board in BOARDS}
 
 @router.get("/logs")
-def get_log_entries(admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
+def get_log_entries(admin_user: Principal = Depends(get_admin_user), db: Session = Depends(get_db)):
     logs = db.query(LogEntry).order_by(LogEntry.timestamp.desc()).limit(100).all()
     return [  # Optionally sanitize/limit fields
         {
@@ -62,9 +74,26 @@ def get_log_entries(admin_user: User = Depends(get_admin_user), db: Session = De
     ]
 
 @router.get("/logs/title-generation", response_class=PlainTextResponse)
-def read_title_logs(admin: bool = Depends(verify_admin_user)):
-    if not os.path.exists(LOG_PATH):
+def read_title_logs(
+    level: Optional[str] = None,
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=LOG_QUERY_MAX_LIMIT),
+    admin: bool = Depends(verify_admin_user)
+):
+    if not TITLE_LOG.files():
         raise HTTPException(status_code=404, detail="Log file not found.")
 
-    with open(LOG_PATH, "r") as log_file:
-        return log_file.read()[-5000:]  # Return last 5000 characters of the log
\ No newline at end of file
+    # Tail of the log, rotated .gz backups included; X-Next-Cursor pages further back
+    try:
+        page = TITLE_LOG.query(level=level, user_id=user_id, since=since, until=until, cursor=cursor, limit=limit)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    text = "\n".join(record.text for record in reversed(page.records))
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else {}
+    return PlainTextResponse(text + "\n" if text else "", headers=headers)
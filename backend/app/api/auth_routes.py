@@ -1,11 +1,13 @@
 # app/api/auth_routes.py
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from app.services.auth import hash_password, verify_password, create_access_token, decode_access_token
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.security import OAuth2PasswordRequestForm
+from app.services.auth import create_access_token
+from app.services.passwords import hash_password_async, verify_and_update_password
 from app.models.user import User
-from app.db.dependencies import get_db
+from app.db.dependencies import get_async_db
 from pydantic import BaseModel
 
 router = APIRouter(prefix="", tags=["Auth"])
@@ -18,8 +20,8 @@ class UserCreate(BaseModel):
     preferred_language: str = "English"
 
 @router.post("/create-user/")
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    hashed_pw = hash_password(user_data.password)
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    hashed_pw = await hash_password_async(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -28,34 +30,24 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         preferred_language=user_data.preferred_language
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login/")
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    user_id = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    await db.commit()
+    await db.refresh(user)
     return user
 
 @router.post("/login/")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (
+        await db.execute(select(User).where(User.username == form_data.username))
+    ).scalars().first()
+    if not user or user.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash uses an outdated cost factor; upgrade it transparently.
+        user.hashed_password = new_hash
+        await db.commit()
     token = create_access_token(data={"sub": str(user.id)})
     return {
         "access_token": token,
@@ -0,0 +1,44 @@
+# app/api/badge_routes.py
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dependencies import get_async_db
+from app.models.badge import Badge, UserBadge
+from app.services.principal import Principal, get_current_principal
+
+router = APIRouter(prefix="/badges", tags=["Badges"])
+
+
+def _badge_out(badge: Badge) -> dict:
+    return {
+        "id": badge.id,
+        "name": badge.name,
+        "description": badge.description,
+        "icon": badge.icon,
+        "rule_type": badge.rule_type,
+        "threshold": badge.threshold,
+    }
+
+
+@router.get("/")
+async def list_badges(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    badges = (await db.execute(select(Badge).order_by(Badge.id))).scalars().all()
+    return [_badge_out(badge) for badge in badges]
+
+
+@router.get("/me")
+async def get_my_badges(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    rows = (await db.execute(
+        select(Badge, UserBadge.awarded_at)
+        .join(UserBadge, UserBadge.badge_id == Badge.id)
+        .where(UserBadge.user_id == current_user.id)
+        .order_by(UserBadge.awarded_at)
+    )).all()
+    return [{**_badge_out(badge), "awarded_at": awarded_at} for badge, awarded_at in rows]
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.db.dependencies import get_db
-from app.models.conversation import ChatSession
-from app.models.user import User
-from app.services.chatbot_service import get_chatbot_response
-from app.services.conversation_service import save_message
-from app.services.gamification_service import handle_user_xp_and_level_up
-from app.services.title_generator import generate_title_from_message
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import AsyncSessionLocal
+from app.db.dependencies import get_async_db
+from app.services.chatbot_service import stream_chatbot_response, build_system_prompt
+from app.services.context_builder import build_context
+from app.services.chat_turn import run_chat_turn, load_session_and_user, persist_turn, run_moderation, ChatTurnRejected
 from app.config.limiter import limiter
 from app.i18n.utils import get_error_message
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# "on-request": send Server-Timing when the client sends X-Debug-Timings: 1; "always"; or "off"
+CHAT_TIMING_HEADER = os.getenv("CHAT_TIMING_HEADER", "on-request")
 
 router = APIRouter(prefix="", tags=["Chat"])
 
@@ -18,33 +26,80 @@ class MessageRequest(BaseModel):
     user_id: int
     chat_session_id: int
     language: str = "English"  # Optional language for i18n errors and title gen
+    bypass_cache: bool = False  # Skip the response cache for this turn
+
 
-@router.post("/chat")
-@limiter.limit("10/minute")
-async def chat_with_bot(request: Request, data: MessageRequest, db: Session = Depends(get_db)):
-    session = db.query(ChatSession).filter_by(id=data.chat_session_id, user_id=data.user_id).first()
-    if not session:
-        error = get_error_message("chat_session_not_found", data.language)
-        raise HTTPException(status_code=404, detail=error)
+def _use_response_cache(request: Request, data: MessageRequest) -> bool:
+    return not data.bypass_cache and "no-cache" not in request.headers.get("cache-control", "")
 
-    user = db.query(User).filter_by(id=data.user_id).first()
-    if not user:
-        error = get_error_message("user_not_found", data.language)
-        raise HTTPException(status_code=404, detail=error)
 
-    if not session.title:
-        preferred_language = getattr(user, "preferred_language", data.language)
-        session.title = await generate_title_from_message(data.message, data.user_id, preferred_language)
-        db.commit()
+def _wants_timings(request: Request) -> bool:
+    if CHAT_TIMING_HEADER == "always":
+        return True
+    return CHAT_TIMING_HEADER == "on-request" and request.headers.get("x-debug-timings") == "1"
 
-    save_message(db, data.user_id, "user", data.message, data.chat_session_id)
-    bot_response = await get_chatbot_response(data.message, data.user_id, data.chat_session_id, data.language)
-    save_message(db, data.user_id, "assistant", bot_response, data.chat_session_id)
+@router.post("/chat", dependencies=[Depends(limiter.limit("10/minute", scope="chat"))])
+async def chat_with_bot(request: Request, response: Response, data: MessageRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await run_chat_turn(
+        db, data.message, data.user_id, data.chat_session_id, data.language, _use_response_cache(request, data)
+    )
 
-    xp_earned = handle_user_xp_and_level_up(user, len(data.message), db)
+    if _wants_timings(request):
+        response.headers["Server-Timing"] = result.timings.server_timing()
 
     return {
-        "response": bot_response,
-        "xp_earned": xp_earned,
-        "current_level": user.current_level
+        "response": result.response,
+        "xp_earned": result.xp_earned,
+        "current_level": result.current_level
     }
+
+
+# -------- Streaming variant: tokens as SSE events or newline-delimited JSON --------
+def _format_event(event: str, data: dict, as_sse: bool) -> str:
+    if as_sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+@router.post("/chat/stream", dependencies=[Depends(limiter.limit("10/minute", scope="chat"))])
+async def chat_with_bot_stream(request: Request, data: MessageRequest, db: AsyncSession = Depends(get_async_db)):
+    session, user = await load_session_and_user(db, data.chat_session_id, data.user_id, data.language)
+    try:
+        history, _ = await asyncio.gather(
+            build_context(db, session, build_system_prompt(data.language), data.message, data.language),
+            run_moderation(data.message, user)
+        )
+    except ChatTurnRejected as e:
+        raise HTTPException(status_code=400, detail=get_error_message(e.error_key, data.language))
+    as_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def event_stream():
+        parts = []
+        try:
+            async for token in stream_chatbot_response(data.message, data.language, history, _use_response_cache(request, data)):
+                parts.append(token)
+                yield _format_event("token", {"token": token}, as_sse)
+        except Exception:
+            logger.exception("Streaming chat reply failed (chat_session_id=%s)", data.chat_session_id)
+            yield _format_event("error", {"detail": get_error_message("chat_response_failed", data.language)}, as_sse)
+            return
+
+        bot_response = "".join(parts).strip()
+
+        # The request-scoped session may already be closed once streaming starts,
+        # so the turn is persisted through a session owned by the generator.
+        async with AsyncSessionLocal() as stream_db:
+            stream_session, stream_user = await load_session_and_user(stream_db, data.chat_session_id, data.user_id, data.language)
+            xp_earned = await persist_turn(stream_db, stream_session, stream_user, data.message, bot_response, data.language)
+            current_level = stream_user.current_level
+
+        yield _format_event("done", {
+            "response": bot_response,
+            "xp_earned": xp_earned,
+            "current_level": current_level
+        }, as_sse)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if as_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,14 @@
 # backend/app/api/chat_session_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response
 from sqlalchemy.orm import Session
-from app.db.dependencies import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dependencies import get_db, get_async_db
 from app.models.user import User
+from app.utils.http_cache import make_etag, conditional_response, PRIVATE_REVALIDATE
 from app.schemas.chat_session import ChatSessionCreate, ChatSessionResponse
 from app.models.conversation import ChatSession as ChatSessionModel
+from app.services.purge import request_session_deletion
 from typing import List
 import logging
 
@@ -15,7 +18,13 @@ router = APIRouter(prefix="/chat-sessions", tags=["Chat Sessions"])
 
 @router.post("/", response_model=ChatSessionResponse)
 def create_chat_session(session_data: ChatSessionCreate, db: Session = Depends(get_db)):
-    new_session = ChatSessionModel(user_id=session_data.user_id, title=session_data.title or "New Chat")
+    # Sessions without a real title get one generated from their first message
+    needs_title = not session_data.title or session_data.title == "New Chat"
+    new_session = ChatSessionModel(
+        user_id=session_data.user_id,
+        title=session_data.title or "New Chat",
+        title_status="pending" if needs_title else "ready"
+    )
     db.add(new_session)
     db.commit()
     db.refresh(new_session)
@@ -23,31 +32,39 @@ def create_chat_session(session_data: ChatSessionCreate, db: Session = Depends(g
 
 
 @router.get("/user/{user_id}", response_model=List[ChatSessionResponse])
-def get_user_sessions(user_id: int, db: Session = Depends(get_db)):
+def get_user_sessions(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     try:
-        return db.query(ChatSessionModel).filter(ChatSessionModel.user_id == user_id).all()
+        # users.sessions_version changes whenever a session is added, renamed, retitled or deleted
+        version = db.query(User.sessions_version).filter(User.id == user_id).scalar()
+        etag = make_etag("sessions", user_id, version)
+        not_modified = conditional_response(request, response, etag, PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
+        return db.query(ChatSessionModel).filter(
+            ChatSessionModel.user_id == user_id, ChatSessionModel.deleted_at.is_(None)
+        ).all()
     except Exception as e:
         print("❌ Error in get_user_sessions:", e)
         raise
 
 @router.put("/{session_id}", response_model=ChatSessionResponse)
 def rename_chat_session(session_id: int, title: str = Body(...), db: Session = Depends(get_db)):
-    session = db.query(ChatSessionModel).filter(ChatSessionModel.id == session_id).first()
+    session = db.query(ChatSessionModel).filter(
+        ChatSessionModel.id == session_id, ChatSessionModel.deleted_at.is_(None)
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     session.title = title
+    session.title_status = "ready"
     db.commit()
     db.refresh(session)
     return session
 
     
-@router.delete("/{session_id}")
-def delete_session(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(ChatSessionModel).filter(ChatSessionModel.id == session_id).first()
-    if not session:
+@router.delete("/{session_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    # The session disappears now; its messages are removed in batches by a background job
+    if await request_session_deletion(db, session_id) is None:
         raise HTTPException(status_code=404, detail="Chat session not found")
-    db.delete(session)
-    db.commit()
     return {"detail": "Chat session deleted successfully"}
 
-logging.basicConfig(level=logging.DEBUG)
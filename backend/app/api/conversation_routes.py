@@ -1,10 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from app.db.database import SessionLocal
-from app.services.conversation_service import save_message, get_user_conversations_by_session
+from app.db.dependencies import get_async_db
+from app.services.conversation_service import (
+    save_message,
+    get_user_conversations_by_session,
+    decode_cursor,
+    message_to_dict,
+    get_sessions_page,
+    get_first_message_pages,
+    get_messages_page,
+    live_session,
+)
 from app.models.conversation import ConversationHistory
 from app.models.conversation import ChatSession
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/conversations",
@@ -21,19 +34,21 @@ def get_db():
 
 # -------- Save a message under a session --------
 @router.post("/save/")
-def save_conversation(
+async def save_conversation(
     user_id: int,
     chat_session_id: int,
     role: str,
     message: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Optional: Validate chat_session belongs to user
-    session = db.query(ChatSession).filter_by(id=chat_session_id, user_id=user_id).first()
+    session = (await db.execute(
+        select(ChatSession).filter_by(id=chat_session_id, user_id=user_id, deleted_at=None)
+    )).scalars().first()
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found or doesn't belong to the user.")
     
-    conversation = save_message(db, user_id, role, message, chat_session_id)
+    conversation = await save_message(db, user_id, role, message, chat_session_id)
     return {"message": "Message saved successfully", "data": conversation}
 
 # -------- Get conversation history (either all or by session) --------
@@ -46,12 +61,13 @@ def get_conversation_history(
     if chat_session_id:
         messages = db.query(ConversationHistory)\
             .filter_by(user_id=user_id, chat_session_id=chat_session_id)\
+            .filter(live_session(chat_session_id))\
             .order_by(ConversationHistory.timestamp.asc())\
             .all()
-        return messages
+        return FastJSONResponse([message_to_dict(m) for m in messages])
 
     # If no session ID is provided, return all sessions and their messages
-    sessions = db.query(ChatSession).filter_by(user_id=user_id).all()
+    sessions = db.query(ChatSession).filter_by(user_id=user_id, deleted_at=None).all()
     session_data = []
 
     for session in sessions:
@@ -61,12 +77,59 @@ def get_conversation_history(
             .all()
         session_data.append({
             "chat_session_id": session.id,
-            "session_name": session.name,
+            "session_name": session.title,
             "created_at": session.created_at,
-            "messages": messages
+            "messages": [message_to_dict(m) for m in messages]
         })
 
     if not session_data:
         raise HTTPException(status_code=404, detail="No conversation sessions found for this user.")
     
-    return session_data
+    # Plain dicts rendered by orjson; no jsonable_encoder pass over every message
+    return FastJSONResponse(session_data)
+
+
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# -------- Paginated history: a page of sessions with the first page of each --------
+@router.get("/history/{user_id}/page")
+async def get_conversation_history_page(
+    user_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    messages_limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    sessions, next_cursor = await get_sessions_page(db, user_id, _parse_cursor(cursor), limit)
+    pages = await get_first_message_pages(db, user_id, [s.id for s in sessions], messages_limit)
+
+    session_data = []
+    for session in sessions:
+        messages, messages_cursor = pages[session.id]
+        session_data.append({
+            "chat_session_id": session.id,
+            "session_name": session.title,
+            "created_at": session.created_at,
+            "messages": [message_to_dict(m) for m in messages],
+            "next_messages_cursor": messages_cursor
+        })
+
+    return FastJSONResponse({"sessions": session_data, "next_cursor": next_cursor})
+
+# -------- Paginated messages of one session --------
+@router.get("/history/{user_id}/sessions/{chat_session_id}")
+async def get_session_messages_page(
+    user_id: int,
+    chat_session_id: int,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    messages, next_cursor = await get_messages_page(db, user_id, chat_session_id, _parse_cursor(cursor), limit)
+    return FastJSONResponse({"messages": [message_to_dict(m) for m in messages], "next_cursor": next_cursor})
@@ -0,0 +1,30 @@
+# app/api/leaderboard_routes.py
+
+from fastapi import APIRouter, Depends, Query
+from typing import Literal
+from app.services.principal import Principal, get_current_principal
+from app.services.leaderboard import get_top, get_rank, period_key
+
+router = APIRouter(prefix="/leaderboards", tags=["Leaderboards"])
+
+Board = Literal["messages", "xp"]
+Period = Literal["all", "week", "month"]
+
+
+@router.get("/{board}")
+async def get_leaderboard(
+    board: Board,
+    period: Period = Query("all"),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal)
+):
+    return {"board": board, "period": period_key(period), "entries": await get_top(board, period, limit)}
+
+
+@router.get("/{board}/me")
+async def get_my_rank(
+    board: Board,
+    period: Period = Query("all"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    return await get_rank(board, period, current_user.id)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import List, Optional
 from pydantic import BaseModel
-from app.models.user import User
-from app.services.auth import get_current_user
-from app.db.dependencies import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.principal import Principal, get_current_principal
+from app.services.dependencies import get_admin_user
+from app.services.lesson_catalog import lesson_catalog
+from app.crud.lesson import create_lesson
+from app.schemas.lesson import LessonCreate
+from app.db.dependencies import get_async_db
+from app.utils.http_cache import make_etag, conditional_response, PRIVATE_SHORT, PRIVATE_LONG
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
@@ -21,83 +25,6 @@ class QuizAnswer(BaseModel):
     answer: str
     user_id: int
 
-# Sample lessons data
-LESSONS = [
-    {
-        "id": 1,
-        "title": "Coffee Shop Conversation",
-        "description": "Practice ordering coffee and having a casual conversation at a coffee shop",
-        "type": "dialog",
-        "content": {
-            "scenario": "You're at a coffee shop. The barista greets you.",
-            "bot_role": "barista",
-            "initial_message": "Hi there! Welcome to our coffee shop. What can I get for you today?",
-            "feedback_after_messages": 5
-        }
-    },
-    {
-        "id": 2,
-        "title": "Basic Grammar Quiz",
-        "description": "Test your knowledge of basic grammar rules",
-        "type": "quiz",
-        "content": {
-            "questions": [
-                {
-                    "id": 1,
-                    "question": "Which sentence is grammatically correct?",
-                    "options": [
-                        "I am going to the store yesterday",
-                        "I went to the store yesterday",
-                        "I going to the store yesterday",
-                        "I goes to the store yesterday"
-                    ],
-                    "correct_answer": "I went to the store yesterday"
-                },
-                {
-                    "id": 2,
-                    "question": "Choose the correct article: ___ apple is red.",
-                    "options": ["a", "an", "the", "none"],
-                    "correct_answer": "an"
-                },
-                {
-                    "id": 3,
-                    "question": "Which is the correct past tense of 'go'?",
-                    "options": ["goed", "went", "gone", "going"],
-                    "correct_answer": "went"
-                }
-            ]
-        }
-    },
-    {
-        "id": 3,
-        "title": "Vocabulary Quiz",
-        "description": "Test your knowledge of common vocabulary",
-        "type": "quiz",
-        "content": {
-            "questions": [
-                {
-                    "id": 1,
-                    "question": "What is the opposite of 'hot'?",
-                    "options": ["warm", "cold", "cool", "freezing"],
-                    "correct_answer": "cold"
-                },
-                {
-                    "id": 2,
-                    "question": "Which word means 'very happy'?",
-                    "options": ["sad", "angry", "delighted", "tired"],
-                    "correct_answer": "delighted"
-                },
-                {
-                    "id": 3,
-                    "question": "What is a synonym for 'big'?",
-                    "options": ["small", "tiny", "huge", "little"],
-                    "correct_answer": "huge"
-                }
-            ]
-        }
-    }
-]
-
 LEARNING_TIPS = [
     "Practice speaking every day, even if it's just for a few minutes",
     "Watch movies and TV shows in the language you're learning",
@@ -110,23 +37,45 @@ LEARNING_TIPS = [
     "Don't be afraid to make mistakes",
     "Immerse yourself in the language as much as possible"
 ]
+TIPS_ETAG = make_etag("tips", *LEARNING_TIPS)
 
 @router.get("/", response_model=List[LessonResponse])
 async def get_lessons(
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal)
+):
+    catalog = await lesson_catalog.snapshot()
+    not_modified = conditional_response(request, response, make_etag("lessons", catalog.digest), PRIVATE_SHORT)
+    if not_modified:
+        return not_modified
+    return list(catalog.lessons)
+
+@router.post("/", response_model=LessonResponse)
+async def add_lesson(
+    lesson: LessonCreate,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Principal = Depends(get_admin_user)
 ):
-    return LESSONS
+    db_lesson = await create_lesson(db, lesson)
+    catalog = await lesson_catalog.snapshot()
+    return catalog.by_id[db_lesson.id]
 
 @router.get("/tips")
 async def get_learning_tips(
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal)
 ):
+    not_modified = conditional_response(request, response, TIPS_ETAG, PRIVATE_LONG)
+    if not_modified:
+        return not_modified
     return {"tips": LEARNING_TIPS}
 
 @router.post("/quiz/check")
 async def check_quiz_answer(
     answer: QuizAnswer,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.id != answer.user_id:
         raise HTTPException(
@@ -134,25 +83,25 @@ async def check_quiz_answer(
             detail="Not authorized to submit answers for this user"
         )
 
-    # Find the lesson and question
-    lesson = next((l for l in LESSONS if l["id"] == answer.lesson_id), None)
-    if not lesson or lesson["type"] != "quiz":
+    # Both lookups are dict hits on the catalog snapshot
+    catalog = await lesson_catalog.snapshot()
+    if answer.lesson_id not in catalog.quiz_ids:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson not found or not a quiz"
         )
 
-    question = next((q for q in lesson["content"]["questions"] if q["id"] == answer.question_id), None)
-    if not question:
+    correct_answer = catalog.answers.get((answer.lesson_id, answer.question_id))
+    if correct_answer is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found"
         )
 
     # Check if the answer is correct
-    is_correct = answer.answer == question["correct_answer"]
+    is_correct = answer.answer == correct_answer
     
     return {
         "is_correct": is_correct,
-        "correct_answer": question["correct_answer"] if not is_correct else None
+        "correct_answer": correct_answer if not is_correct else None
     } 
\ No newline at end of file
@@ -9,6 +9,8 @@ from app.api.chat_session_routes import router as chat_session_router
 from app.admin.admin_setup import router as admin_router
 from app.api import admin_analytics_routes
 from app.api.lesson_routes import router as lessons_router
+from app.api.leaderboard_routes import router as leaderboard_router
+from app.api.badge_routes import router as badge_router
 
 
 
@@ -20,6 +22,8 @@ router.include_router(user_router)
 router.include_router(conversation_router)
 router.include_router(chat_session_router)
 router.include_router(lessons_router)
+router.include_router(leaderboard_router)
+router.include_router(badge_router)
 
 #Admin functionality
 router.include_router(admin_router)
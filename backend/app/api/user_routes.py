@@ -1,29 +1,42 @@
 # app/api/user_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Body
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Body, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.dependencies import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dependencies import get_db, get_async_db
 from app.models.user import User
-from app.services.auth import get_current_user, hash_password
+from app.services.passwords import hash_password_async
+from app.services.principal import (
+    Principal,
+    principal_cache,
+    get_current_principal,
+    get_current_user,
+    get_current_user_async,
+)
+from app.services.dependencies import get_admin_user
 from app.schemas.user import UserCreate, UserUpdate, UserOut
+from app.utils.http_cache import make_etag, conditional_response, PRIVATE_REVALIDATE
+from app.services.avatars import avatar_store
+from app.services.purge import request_user_deletion
 from pydantic import BaseModel
-import shutil
-import os
-from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/", response_model=UserOut)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter_by(username=user.username).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = (
+        await db.execute(select(User.id).where(User.username == user.username))
+    ).first()
     if existing:
         raise HTTPException(status_code=400, detail="Username already taken")
     
     new_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         preferred_language=user.preferred_language,
         language_level=user.language_level,
         display_name=user.display_name,
@@ -32,48 +45,43 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         avatar_url=user.avatar_url,
         bio=user.bio
     )
-    db.add(new_user) 
-    db.commit()
-    db.refresh(new_user)
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(user_id: int, update: UserUpdate, db: Session = Depends(get_db)):
-    user = db.query(User).filter_by(id=user_id).first()
+async def update_user(user_id: int, update: UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     update_data = update.dict(exclude_unset=True)
 
     if "password" in update_data:
-        user.hashed_password = hash_password(update_data.pop("password"))
+        user.hashed_password = await hash_password_async(update_data.pop("password"))
 
     for field, value in update_data.items():
         setattr(user, field, value)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    principal_cache.invalidate_user(user.id)
     return user
 
-AVATAR_UPLOAD_DIR = "static/avatars"
+async def _save_avatar(user: User, avatar: UploadFile, db: AsyncSession) -> dict:
+    # Streamed, size-capped and content-addressed (see app/services/avatars.py);
+    # thumbnails are rendered in the background
+    stored = await avatar_store.store(avatar)
+    user.avatar_url = stored.url
+    await db.commit()
+    principal_cache.invalidate_user(user.id)
+    return {"avatar_url": stored.url, "thumbnails": stored.thumbnails}
 
 @router.post("/profile/upload-avatar/")
-def upload_avatar(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    if file.content_type not in ["image/jpeg", "image/png"]:
-        raise HTTPException(status_code=400, detail="Invalid file type")
-    
-    filename = f"user_{current_user.id}_{file.filename}"
-    filepath = os.path.join(AVATAR_UPLOAD_DIR, filename)
-
-    os.makedirs(AVATAR_UPLOAD_DIR, exist_ok=True)
-
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    current_user.avatar_url = f"/static/avatars/{filename}"
-    db.commit()
-    return {"avatar_url": filepath}
+async def upload_avatar(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    return await _save_avatar(current_user, file, db)
 
 @router.post("/profile/set-language/")
 def set_language(
@@ -83,27 +91,40 @@ def set_language(
 ):
     current_user.preferred_language = preferred_language
     db.commit()
+    principal_cache.invalidate_user(current_user.id)
     return {"message": "Language updated", "preferred_language": preferred_language}
 
+class AccountStatusUpdate(BaseModel):
+    is_banned: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
 class PasswordChange(BaseModel):
     current_password: str
     new_password: str
 
 @router.get("/me", response_model=UserOut)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_current_user_info(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal)
+):
+    etag = make_etag("me", current_user.id, current_user.row_version)
+    not_modified = conditional_response(request, response, etag, PRIVATE_REVALIDATE)
+    if not_modified:
+        return not_modified
+    return current_user.to_dict()
 
 @router.put("/{user_id}/profile")
 async def update_profile(
     user_id: int,
     update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this profile")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -113,58 +134,76 @@ async def update_profile(
         if hasattr(user, field):
             setattr(user, field, value)
     
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
     return {"message": "Profile updated successfully"}
 
 @router.post("/{user_id}/change-password")
 async def change_password(
     user_id: int,
     password_data: PasswordChange,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to change this password")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Hash and update password
-    user.hashed_password = hash_password(password_data.new_password)
-    db.commit()
+    user.hashed_password = await hash_password_async(password_data.new_password)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
     return {"message": "Password changed successfully"}
 
 @router.post("/{user_id}/upload-avatar")
-async def upload_avatar(
+async def upload_user_avatar(
     user_id: int,
     avatar: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this avatar")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Create uploads directory if it doesn't exist
-    upload_dir = "uploads/avatars"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{user_id}_{timestamp}_{avatar.filename}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await avatar.read()
-        buffer.write(content)
-    
-    # Update user's avatar URL
-    user.avatar_url = f"/uploads/avatars/{filename}"
-    db.commit()
-    
-    return {"message": "Avatar uploaded successfully", "avatar_url": user.avatar_url}
\ No newline at end of file
+    saved = await _save_avatar(user, avatar, db)
+    return {"message": "Avatar uploaded successfully", **saved}
+
+@router.put("/{user_id}/status", response_model=UserOut)
+async def update_account_status(
+    user_id: int,
+    update: AccountStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    admin_user: Principal = Depends(get_admin_user)
+):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    for field, value in update.dict(exclude_unset=True).items():
+        if value is not None:
+            setattr(user, field, value)
+
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
+    return user
+
+@router.delete("/{user_id}", status_code=202)
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    if current_user.id != user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to delete this account")
+
+    # The account is locked out now; its data is purged in batches by a background job
+    if not await request_user_deletion(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "Account scheduled for deletion"}
@@ -1,4 +1,323 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+# app/config/limiter.py
+#
+# Sliding-window rate limiting shared by all worker processes.
+#
+# Counters live in a pluggable storage selected by RATE_LIMIT_STORAGE_URL:
+#   memory://              per-process (dev / single worker only)
+#   sqlite:///path/to.db   shared by every worker on one host (default)
+#   redis://host:6379/0    shared across hosts; needs `pip install "redis>=5"`, which is
+#                          not in requirements.txt since the other storages don't use it
+#
+# Requests are keyed on the user id from the bearer token, falling back to the
+# client IP, so a classroom behind one NAT no longer shares a single bucket.
+# Each window keeps two counters (current and previous fixed window); the
+# previous one is weighted by how much of it still overlaps the sliding window.
+#
+# Usage: route-level limits are dependencies,
+#     @router.post("/chat", dependencies=[Depends(limiter.limit("10/minute"))])
+# and RateLimitMiddleware applies RATE_LIMIT_DEFAULT to every /api request and
+# adds X-RateLimit-* headers to the response.
 
-limiter = Limiter(key_func=get_remote_address)
+import asyncio
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+from app.services.auth import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STORAGE_URL = os.getenv(
+    "RATE_LIMIT_STORAGE_URL",
+    "sqlite:///" + os.path.join(tempfile.gettempdir(), "chatbot_rate_limits.db"),
+)
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "300/minute")  # "" disables the global limit
+RATE_LIMIT_MEMORY_MAX_KEYS = int(os.getenv("RATE_LIMIT_MEMORY_MAX_KEYS", 100_000))
+
+RATE_LIMIT_MESSAGE = "Rate limit exceeded. Please slow down."
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """'10/minute' -> (10, 60). Also accepts plurals and '5/10 minutes'."""
+    count, _, period = rate.partition("/")
+    period = period.strip().lower()
+    multiplier = 1
+    head = period.split()
+    if len(head) == 2 and head[0].isdigit():
+        multiplier, period = int(head[0]), head[1]
+    period = period.rstrip("s")
+    if period not in _UNITS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    return int(count), _UNITS[period] * multiplier
+
+
+def _slide(state: Optional[Tuple[int, int, int]], now: float, limit: int, window: int):
+    """Applies one hit to (window_index, current, previous).
+
+    Returns (new_state, allowed, estimated_count_after)."""
+    index = int(now // window)
+    current = previous = 0
+    if state:
+        stored_index, stored_current, stored_previous = state
+        if stored_index == index:
+            current, previous = stored_current, stored_previous
+        elif stored_index == index - 1:
+            previous = stored_current
+    weight = 1 - (now % window) / window
+    estimate = previous * weight + current
+    if estimate + 1 > limit:
+        return (index, current, previous), False, estimate
+    return (index, current + 1, previous), True, estimate + 1
+
+
+# -------- Storages --------
+class MemoryStorage:
+    """Per-process counters; only correct with a single worker."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: int, now: float):
+        state, allowed, estimate = _slide(self._state.get(key), now, limit, window)
+        self._state[key] = state
+        self._state.move_to_end(key)
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+        return allowed, estimate
+
+
+class SQLiteStorage:
+    """Counters in a local SQLite file, shared by all workers on the host.
+
+    Each hit is one short IMMEDIATE transaction, run off the event loop."""
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        " key TEXT PRIMARY KEY, window_index INTEGER NOT NULL,"
+        " current INTEGER NOT NULL, previous INTEGER NOT NULL, expires_at REAL NOT NULL)"
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _hit(self, key: str, limit: int, window: int, now: float):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, allowed, estimate = _slide(row, now, limit, window)
+            if allowed:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, window_index, current, previous, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, *state, (state[0] + 2) * window),
+                )
+            # Occasionally drop keys whose counters can no longer affect a decision.
+            if random.random() < 0.001:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, estimate
+
+    async def hit(self, key: str, limit: int, window: int, now: float):
+        return await asyncio.to_thread(self._hit, key, limit, window, now)
+
+
+class RedisStorage:
+    """Counters in Redis (or any server speaking its protocol), updated atomically by a Lua script."""
+
+    _SCRIPT = """
+    local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+    local estimate = previous * tonumber(ARGV[1]) + current
+    if estimate + 1 > tonumber(ARGV[2]) then
+        return {0, tostring(estimate)}
+    end
+    redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return {1, tostring(estimate + 1)}
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL points to Redis but the 'redis' package is not installed") from e
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: int, now: float):
+        index = int(now // window)
+        weight = 1 - (now % window) / window
+        allowed, estimate = await self._script(
+            keys=[f"rl:{key}:{index}", f"rl:{key}:{index - 1}"],
+            args=[weight, limit, window * 2],
+        )
+        return bool(int(allowed)), float(estimate)
+
+
+def create_storage(url: str):
+    if url.startswith("memory://"):
+        return MemoryStorage()
+    if url.startswith("sqlite:///"):
+        return SQLiteStorage(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStorage(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL: {url!r}")
+
+
+# -------- Limiter --------
+class RateLimitExceeded(HTTPException):
+    def __init__(self, headers: dict):
+        super().__init__(status_code=429, detail=RATE_LIMIT_MESSAGE, headers=headers)
+
+
+def _rate_headers(limit: int, window: int, estimate: float, now: float) -> dict:
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(max(0, math.floor(limit - estimate))),
+        "X-RateLimit-Reset": str(math.ceil(window - now % window)),
+    }
+
+
+def client_identity(request: Request) -> str:
+    """user:<id> for a valid bearer token, otherwise ip:<address>."""
+    cached = getattr(request.state, "rate_limit_identity", None)
+    if cached:
+        return cached
+    identity = None
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        payload = decode_access_token(auth[7:])
+        if payload and payload.get("sub"):
+            identity = f"user:{payload['sub']}"
+    if identity is None:
+        identity = f"ip:{request.client.host if request.client else 'unknown'}"
+    request.state.rate_limit_identity = identity
+    return identity
+
+
+class Limiter:
+    def __init__(self, storage_url: str, enabled: bool = True):
+        self.storage_url = storage_url
+        self.enabled = enabled
+        self._storage = None
+        self._allowed = 0
+        self._limited = 0
+        self._errors = 0
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = create_storage(self.storage_url)
+        return self._storage
+
+    async def hit(self, scope: str, identity: str, limit: int, window: int) -> Tuple[bool, dict]:
+        """Counts one request; returns (allowed, headers). Fails open if the storage is unavailable."""
+        now = time.time()
+        try:
+            allowed, estimate = await self.storage.hit(f"{scope}:{identity}", limit, window, now)
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Rate limit storage error, allowing request: %s", e)
+            return True, {}
+        headers = _rate_headers(limit, window, estimate, now)
+        if allowed:
+            self._allowed += 1
+        else:
+            self._limited += 1
+            headers["Retry-After"] = headers["X-RateLimit-Reset"]
+        return allowed, headers
+
+    def limit(self, rate: str, scope: Optional[str] = None):
+        """FastAPI dependency enforcing `rate` for the route it is attached to."""
+        limit, window = parse_rate(rate)
+
+        async def dependency(request: Request):
+            if not self.enabled:
+                return
+            route_scope = scope or getattr(request.scope.get("route"), "path", request.url.path)
+            allowed, headers = await self.hit(route_scope, client_identity(request), limit, window)
+            # The most specific limit wins for the response headers.
+            request.state.rate_limit_headers = headers
+            if not allowed:
+                raise RateLimitExceeded(headers)
+
+        return dependency
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "storage": type(self.storage).__name__,
+            "default_limit": RATE_LIMIT_DEFAULT or None,
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "storage_errors": self._errors,
+        }
+
+
+limiter = Limiter(RATE_LIMIT_STORAGE_URL, RATE_LIMIT_ENABLED)
+
+
+class RateLimitMiddleware:
+    """Applies the global default limit to /api requests and adds the
+    X-RateLimit-* headers (from the route limit when there is one)."""
+
+    def __init__(self, app, default_rate: str = RATE_LIMIT_DEFAULT, path_prefix: str = "/api"):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.default = parse_rate(default_rate) if default_rate else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not limiter.enabled or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        default_headers = {}
+        if self.default:
+            allowed, default_headers = await limiter.hit("global", client_identity(request), *self.default)
+            if not allowed:
+                response = JSONResponse(status_code=429, content={"detail": RATE_LIMIT_MESSAGE}, headers=default_headers)
+                await response(scope, receive, send)
+                return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = getattr(request.state, "rate_limit_headers", None) or default_headers
+                existing = {k.lower() for k, _ in message.get("headers", [])}
+                extra = [
+                    (k.lower().encode("latin-1"), v.encode("latin-1"))
+                    for k, v in headers.items() if k.lower().encode("latin-1") not in existing
+                ]
+                message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
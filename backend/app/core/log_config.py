@@ -1,19 +1,171 @@
+# app/core/log_config.py
+#
+# The one logging setup for the backend. Loggers only enqueue records; a
+# single QueueListener thread formats them and writes the files, so file I/O,
+# rotation and gzip compression of rotated files never run on the event loop.
+#
+#   logs/app.log               JSON lines from every logger (app.* at INFO, others at WARNING)
+#   logs/title_generation.log  "[asctime] LEVEL: message" from the title_generator logger
+#   stderr                     WARNING and above
+#
+# Rotated files are gzip'd as app.log.1.gz ... app.log.N.gz (read back by
+# app/services/log_reader.py). The queue is bounded (LOG_QUEUE_SIZE). When it
+# is full, LOG_QUEUE_POLICY=drop discards the record, and =block waits up to
+# LOG_QUEUE_BLOCK_TIMEOUT seconds before dropping it. Either way the record is
+# counted in stats(). shutdown_logging() drains the queue before the worker exits.
+#
+# setup_logging() is idempotent and is called when app.main is imported.
+
+import atexit
+import gzip
 import logging
 import logging.handlers
-from pythonjsonlogger import jsonlogger
 import os
+import queue
+import shutil
+import sys
+import threading
+from pythonjsonlogger.json import JsonFormatter
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+APP_LOG_PATH = os.path.join(LOG_DIR, "app.log")
+TITLE_LOG_PATH = os.path.join(LOG_DIR, "title_generation.log")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "WARNING").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop").lower()  # drop | block
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", 0.05))
+
+APP_LOG_MAX_BYTES = 2 * 1024 * 1024
+APP_LOG_BACKUPS = 5
+TITLE_LOG_MAX_BYTES = 100_000
+TITLE_LOG_BACKUPS = 5
+
+# Loggers written at LOG_LEVEL; everything else propagates to the root at WARNING
+APP_LOGGERS = ("app", "title_generator")
+
+
+# -------- Rotation (runs on the listener thread) --------
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _rotating_file_handler(path: str, max_bytes: int, backups: int) -> logging.handlers.RotatingFileHandler:
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+# -------- Queue --------
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue: drops (or briefly blocks) instead of growing."""
+
+    def __init__(self, log_queue: queue.Queue, policy: str = LOG_QUEUE_POLICY, block_timeout: float = LOG_QUEUE_BLOCK_TIMEOUT):
+        super().__init__(log_queue)
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unsupported LOG_QUEUE_POLICY: {policy!r}")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.policy != "block":
+                self._count("dropped")
+                return
+            self._count("blocked")
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return
+        self._count("enqueued")
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class _DrainingListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The base class uses put_nowait, which fails on a full bounded queue
+        self.queue.put(self._sentinel)
+
+
+_queue_handler = None
+_listener = None
+_handlers = []
+
+
+def setup_logging():
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    app_handler = _rotating_file_handler(APP_LOG_PATH, APP_LOG_MAX_BYTES, APP_LOG_BACKUPS)
+    app_handler.setFormatter(JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    title_handler = _rotating_file_handler(TITLE_LOG_PATH, TITLE_LOG_MAX_BYTES, TITLE_LOG_BACKUPS)
+    title_handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s"))
+    title_handler.addFilter(logging.Filter("title_generator"))
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(LOG_CONSOLE_LEVEL)
+    console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    _handlers[:] = [app_handler, title_handler, console_handler]
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = BoundedQueueHandler(log_queue)
+    _listener = _DrainingListener(log_queue, *_handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    if root.level == logging.NOTSET or root.level > logging.WARNING:
+        root.setLevel(logging.WARNING)
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(LOG_LEVEL)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
 
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "app.log")
 
-logger = logging.getLogger("app")
-logger.setLevel(logging.INFO)
+def shutdown_logging():
+    """Writes out everything still queued, then closes the files."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()  # processes the remaining records before returning
+    for handler in _handlers:
+        handler.close()
+    _handlers.clear()
+    _queue_handler = None
+    _listener = None
 
-handler = logging.handlers.RotatingFileHandler(
-    log_file, maxBytes=2 * 1024 * 1024, backupCount=5
-)
-formatter = jsonlogger.JsonFormatter('%(asctime)s %(levelname)s %(name)s %(message)s')
-handler.setFormatter(formatter)
 
-logger.addHandler(handler)
+def stats() -> dict:
+    if _queue_handler is None:
+        return {"running": False}
+    return {
+        "running": True,
+        "policy": _queue_handler.policy,
+        "queue_size": _queue_handler.queue.qsize(),
+        "queue_max": _queue_handler.queue.maxsize,
+        "enqueued": _queue_handler.enqueued,
+        "dropped": _queue_handler.dropped,
+        "blocked": _queue_handler.blocked,
+    }
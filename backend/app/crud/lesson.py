@@ -1,21 +1,28 @@
 # backend/app/crud/lesson.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.lesson import Lesson, QuizQuestion
 from app.schemas.lesson import LessonCreate
+from app.services.lesson_catalog import lesson_catalog
 
-def create_lesson(db: Session, lesson_data: LessonCreate):
+async def create_lesson(db: AsyncSession, lesson_data: LessonCreate):
     db_lesson = Lesson(**lesson_data.dict(exclude={"questions"}))
-    if lesson_data.questions:
-        for q in lesson_data.questions:
-            db_lesson.questions.append(QuizQuestion(**q.dict()))
+    for position, q in enumerate(lesson_data.questions or [], start=1):
+        db_lesson.questions.append(QuizQuestion(**q.dict(exclude={"position"}), position=q.position or position))
     db.add(db_lesson)
-    db.commit()
-    db.refresh(db_lesson)
+    await db.commit()
+    # Readers switch to the new catalog in one reference swap
+    await lesson_catalog.reload()
     return db_lesson
 
-def get_all_lessons(db: Session):
-    return db.query(Lesson).all()
+async def get_all_lessons(db: AsyncSession):
+    result = await db.execute(select(Lesson).options(selectinload(Lesson.questions)).order_by(Lesson.id))
+    return result.scalars().all()
 
-def get_lesson(db: Session, lesson_id: int):
-    return db.query(Lesson).filter(Lesson.id == lesson_id).first()
+async def get_lesson(db: AsyncSession, lesson_id: int):
+    result = await db.execute(
+        select(Lesson).options(selectinload(Lesson.questions)).where(Lesson.id == lesson_id)
+    )
+    return result.scalars().first()
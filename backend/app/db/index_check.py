@@ -0,0 +1,106 @@
+# app/db/index_check.py
+#
+# Fails (exit code 1) when a query issued by conversation_service has no
+# supporting index. Every coroutine in the service is called against an
+# in-memory SQLite schema built from the models, and each captured
+# statement is run through EXPLAIN QUERY PLAN.
+#
+#   python -m app.db.index_check
+
+import asyncio
+import inspect
+import sys
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import StaticPool
+from app.db.database import Base
+from app.models import user, conversation, lesson, job, counter, leaderboard, xp_ledger, badge  # noqa: F401
+from app.services import conversation_service
+
+# Arguments used to call the service functions, by parameter name
+SAMPLE_ARGUMENTS = {
+    "user_id": 1,
+    "chat_session_id": 1,
+    "role": "user",
+    "message": "hello",
+    "title": "Sample",
+    "rows": [conversation_service.message_row(1, "user", "hello", 1)],
+    "session_ids": [1, 2],
+    "cursor": (datetime(2026, 1, 1), 1),
+    "limit": 20,
+    "after_id": 1,
+}
+
+CHECKED_PREFIXES = ("SELECT", "UPDATE", "DELETE")
+
+
+def plan_problems(plan_details: list) -> list:
+    # Scans of subqueries/CTEs are fine; only full scans of real tables count
+    tables = set(Base.metadata.tables)
+    problems = []
+    for detail in plan_details:
+        words = detail.split()
+        if words[0] == "SCAN" and words[1] in tables and "INDEX" not in detail:
+            problems.append(detail)
+        elif "TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+async def check() -> list:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    captured = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(CHECKED_PREFIXES):
+            captured.append((current[0], statement, parameters))
+
+    current = [None]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    failures = []
+    for name, func in inspect.getmembers(conversation_service, inspect.iscoroutinefunction):
+        if name.startswith("_") or func.__module__ != conversation_service.__name__:
+            continue
+        # Optional parameters keep their defaults unless a sample value is given
+        signature = inspect.signature(func).parameters.values()
+        params = [
+            p.name for p in signature
+            if p.name != "db" and (p.name in SAMPLE_ARGUMENTS or p.default is inspect.Parameter.empty)
+        ]
+        missing = [p for p in params if p not in SAMPLE_ARGUMENTS]
+        if missing:
+            failures.append(f"{name}: no sample value for parameter(s) {', '.join(missing)}")
+            continue
+        current[0] = name
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            await func(db, **{p: SAMPLE_ARGUMENTS[p] for p in params})
+
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    async with engine.connect() as conn:
+        for name, statement, parameters in captured:
+            result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            problems = plan_problems([row[3] for row in result])
+            if problems:
+                failures.append(f"{name}: {' ; '.join(problems)}\n    {' '.join(statement.split())}")
+
+    await engine.dispose()
+    return failures
+
+
+def main() -> int:
+    failures = asyncio.run(check())
+    if failures:
+        print("Queries without a supporting index:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("All conversation_service queries are index-backed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
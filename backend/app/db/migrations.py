@@ -0,0 +1,46 @@
+# app/db/migrations.py
+
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from app.db.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Revision matching the tables that Base.metadata.create_all used to build
+BASELINE_REVISION = "0001"
+
+# Arbitrary key so concurrent workers don't migrate at the same time
+MIGRATION_LOCK_ID = 72_410_001
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations():
+    config = alembic_config()
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            tables = inspect(connection).get_table_names()
+            connection.commit()
+            config.attributes["connection"] = connection
+
+            # Databases created before migrations existed already hold the baseline schema
+            if "users" in tables and "alembic_version" not in tables:
+                command.stamp(config, BASELINE_REVISION)
+                connection.commit()
+
+            command.upgrade(config, "head")
+            connection.commit()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                connection.commit()
@@ -0,0 +1,24 @@
+# app/db/upsert.py
+#
+# INSERT ... ON CONFLICT DO UPDATE for the two dialects we run on.
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(dialect_name: str):
+    """The dialect's insert() construct, which provides on_conflict_do_update()."""
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def upsert_add(dialect_name: str, model, rows: list, key_columns: list, value_column: str, extra_set: dict = None):
+    """Inserts rows, or adds each row's `value_column` to the existing one.
+
+    Rows are sorted by key so concurrent upserts lock existing rows in the same order."""
+    rows = sorted(rows, key=lambda row: tuple(row[column] for column in key_columns))
+    stmt = dialect_insert(dialect_name)(model).values(rows)
+    set_ = {value_column: getattr(model, value_column) + getattr(stmt.excluded, value_column)}
+    for column in extra_set or ():
+        set_[column] = getattr(stmt.excluded, column)
+    return stmt.on_conflict_do_update(index_elements=key_columns, set_=set_)
@@ -20,5 +20,15 @@ ERROR_MESSAGES = {
         "English": "Invalid username or password",
         "Spanish": "Nombre de usuario o contraseña inválidos",
         "French": "Nom d'utilisateur ou mot de passe invalide"
+    },
+    "chat_response_failed": {
+        "English": "The assistant could not finish its reply. Please try again.",
+        "Spanish": "El asistente no pudo terminar su respuesta. Inténtalo de nuevo.",
+        "French": "L'assistant n'a pas pu terminer sa réponse. Veuillez réessayer."
+    },
+    "message_flagged": {
+        "English": "Your message was flagged by moderation and was not sent",
+        "Spanish": "Tu mensaje fue marcado por la moderación y no se envió",
+        "French": "Votre message a été signalé par la modération et n'a pas été envoyé"
     }
 }
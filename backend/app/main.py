@@ -1,38 +1,106 @@
+# Queued logging first, so records logged while importing the app are captured too
+from app.core.log_config import setup_logging, shutdown_logging
+setup_logging()
+
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import FileResponse, HTMLResponse
-from app.models.user import Base 
-from app.db.database import engine
+from app.db.database import warm_up_database
+from app.db.migrations import run_migrations
+from app.services.chatbot_service import warm_up_client
+from app.services.message_writer import message_writer
+from app.services.job_queue import start_job_workers, stop_job_workers
+from app.services.passwords import password_hasher
+from app.services.lesson_catalog import lesson_catalog
+from app.services.platform_counters import start_counter_reconciler, stop_counter_reconciler
+from app.services.leaderboard import leaderboards
+from app.services.badges import badge_rules
+from app.services.avatars import avatar_store, AVATAR_DIR, AVATAR_MAX_REQUEST_BYTES, AVATAR_TOO_LARGE
 from app.api.router import router
 from app.models.conversation import ConversationHistory 
-from app.config.limiter import limiter
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from app.config.limiter import RateLimitMiddleware
+from app.utils.responses import FastJSONResponse
+from app.utils.compression import CompressionMiddleware
+from app.utils.uploads import UploadSizeLimitMiddleware
+from app.utils.static_files import ImmutableStaticFiles, PrecompressedStaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
+import logging
 
-# Rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
-
-app = FastAPI(title="Language Learning Platform with Chatbot")
+# All JSON responses render with orjson (see app/utils/responses.py)
+app = FastAPI(title="Language Learning Platform with Chatbot", default_response_class=FastJSONResponse)
 
 # Include API router with prefix
 app.include_router(router, prefix="/api")
-app.state.limiter = limiter
 
-# Serve static files
+# Open pooled DB connections and the OpenAI HTTP connection and load the lesson catalog before traffic arrives
+@app.on_event("startup")
+async def warm_up():
+    try:
+        await warm_up_database()
+    except Exception as e:
+        logging.getLogger(__name__).warning("Database warm-up failed: %s", e)
+    try:
+        await lesson_catalog.reload()
+    except Exception as e:
+        logging.getLogger(__name__).warning("Lesson catalog load failed: %s", e)
+    try:
+        await badge_rules.reload()
+    except Exception as e:
+        logging.getLogger(__name__).warning("Badge rules load failed: %s", e)
+    await warm_up_client()
+    message_writer.start()
+    start_job_workers()
+    lesson_catalog.start()
+    start_counter_reconciler()
+    leaderboards.start()
+    app.state.precompress_task = asyncio.create_task(precompress_static_files())
+
+# Find or build .br/.gz variants of the static files off the event loop; until
+# this finishes, CompressionMiddleware compresses them per request
+async def precompress_static_files():
+    for files in static_mounts:
+        try:
+            summary = await asyncio.to_thread(files.prepare)
+            logging.getLogger(__name__).info("Precompressed static files: %s", summary)
+        except Exception as e:
+            logging.getLogger(__name__).warning("Precompressing %s failed: %s", files.directory, e)
+
+# Stop job workers, drain buffered conversation messages and flush queued log records before the worker exits
+@app.on_event("shutdown")
+async def stop_background_work():
+    await lesson_catalog.stop()
+    await stop_counter_reconciler()
+    await leaderboards.stop()
+    await stop_job_workers()
+    await message_writer.close()
+    password_hasher.shutdown()
+    avatar_store.shutdown()
+    shutdown_logging()
+
+# Content-addressed avatars and thumbnails can be cached forever (see app/services/avatars.py)
+os.makedirs(AVATAR_DIR, exist_ok=True)
+app.mount("/static/avatars", ImmutableStaticFiles(directory=AVATAR_DIR), name="avatars")
+
+# Serve static files (precompressed variants, Cache-Control; see app/utils/static_files.py)
 static_dir = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+static_files = PrecompressedStaticFiles(directory=static_dir)
+app.mount("/static", static_files, name="static")
+static_mounts = [static_files]
+
+# Global per-user/IP rate limit for /api plus X-RateLimit-* headers (see app/config/limiter.py)
+app.add_middleware(RateLimitMiddleware)
+
+# Refuse oversized avatar uploads before the multipart body is spooled (see app/utils/uploads.py)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=AVATAR_MAX_REQUEST_BYTES,
+    path_suffixes=("/upload-avatar",),
+    detail=AVATAR_TOO_LARGE,
+)
 
-# Middleware to handle rate limit exceptions
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=429,
-        content={"detail": "Rate limit exceeded. Please slow down."}
-    )
+# gzip / brotli for larger responses; streams and pre-encoded files pass through
+app.add_middleware(CompressionMiddleware)
 
 # Allow CORS
 app.add_middleware(
@@ -44,12 +112,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After", "X-Next-Cursor"],
 )
 
 # Serve frontend static files 
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "frontend", "dist")
 if os.path.exists(frontend_path):
-    app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
+    # Immutable caching for hashed build assets, index.html for client-side routes
+    frontend_files = PrecompressedStaticFiles(directory=frontend_path, html=True, spa_fallback="index.html")
+    app.mount("/", frontend_files, name="frontend")
+    static_mounts.append(frontend_files)
 else:
     @app.get("/{full_path:path}")
     async def serve_frontend(full_path: str):
@@ -92,5 +164,5 @@ else:
         </html>
         """)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Bring the database schema up to date (see backend/migrations)
+run_migrations()
@@ -0,0 +1,30 @@
+# backend/app/models/badge.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.db.database import Base
+
+
+class Badge(Base):
+    """
+    A badge and the rule that awards it (see app/services/badges.py):
+    rule_type "xp" | "messages" | "streak", earned once the user's metric
+    reaches threshold (XP, messages sent, consecutive active days).
+    """
+    __tablename__ = "badges"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    description = Column(String, nullable=False, default="")
+    icon = Column(String, nullable=True)
+    rule_type = Column(String, nullable=False)
+    threshold = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class UserBadge(Base):
+    __tablename__ = "user_badges"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    badge_id = Column(Integer, ForeignKey("badges.id", ondelete="CASCADE"), primary_key=True)
+    awarded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
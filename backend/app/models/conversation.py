@@ -1,28 +1,46 @@
 # backend/app/models/conversation.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base 
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # Session lists: WHERE user_id = ? ORDER BY created_at
+        Index("ix_chat_sessions_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     title = Column(String, nullable=True)  # <== Title for the chat session
+    title_status = Column(String, nullable=False, default="ready", server_default="ready")  # pending | queued | ready | failed
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Rolling summary of the turns that no longer fit in the model's context
+    summary = Column(Text, nullable=True)
+    summary_until_id = Column(Integer, nullable=True)  # last ConversationHistory.id folded into summary
+
+    # Set when deletion is requested; the session is hidden and purged in the background (app/services/purge.py)
+    deleted_at = Column(DateTime, nullable=True)
+
     user = relationship("User", back_populates="chat_sessions")
-    messages = relationship("ConversationHistory", back_populates="chat_session", cascade="all, delete")
+    # Messages are removed by ON DELETE CASCADE (or in batches by the purge jobs), never loaded for a delete
+    messages = relationship("ConversationHistory", back_populates="chat_session", cascade="all, delete", passive_deletes=True)
 
     
 class ConversationHistory(Base):
     __tablename__ = "conversation_history"
+    __table_args__ = (
+        # History reads: WHERE user_id = ? AND chat_session_id = ? ORDER BY timestamp
+        Index("ix_conversation_history_user_session_ts", "user_id", "chat_session_id", "timestamp", "id"),
+        Index("ix_conversation_history_chat_session_id", "chat_session_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    chat_session_id = Column(Integer, ForeignKey("chat_sessions.id"))  # <-- NEW
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    chat_session_id = Column(Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"))  # <-- NEW
     role = Column(String)
     message = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+# backend/app/models/counter.py
+
+from sqlalchemy import Column, Integer, String, BigInteger
+from app.db.database import Base
+
+
+class PlatformCounter(Base):
+    """
+    Running totals maintained from the write paths (see app/services/platform_counters.py).
+    bucket is "all" for lifetime totals or a UTC date ("2026-10-18") for daily
+    rollups. Each counter is spread over a few slots so concurrent writers
+    don't queue on one row; readers sum the slots.
+    """
+    __tablename__ = "platform_counters"
+
+    name = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    slot = Column(Integer, primary_key=True, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
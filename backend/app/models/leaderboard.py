@@ -0,0 +1,23 @@
+# backend/app/models/leaderboard.py
+
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class LeaderboardScore(Base):
+    """
+    Persisted leaderboard scores (see app/services/leaderboard.py).
+    board: "messages" | "xp"; period: "all", "week:2026-W42" or "month:2026-10".
+    """
+    __tablename__ = "leaderboard_scores"
+    __table_args__ = (
+        # Workers pull rows changed since their last refresh
+        Index("ix_leaderboard_scores_updated_at", "updated_at"),
+    )
+
+    board = Column(String, primary_key=True)
+    period = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 # backend/app/models/lesson.py
 
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import enum
@@ -17,15 +17,24 @@ class Lesson(Base):
     description = Column(Text)
     type = Column(Enum(LessonType), nullable=False)
     context = Column(Text, nullable=True)  # For scenario or quiz context
+    content = Column(JSON, nullable=True)  # Scenario settings: scenario, bot_role, initial_message, ...
 
-    questions = relationship("QuizQuestion", back_populates="lesson", cascade="all, delete-orphan")
+    questions = relationship(
+        "QuizQuestion", back_populates="lesson", cascade="all, delete-orphan", order_by="QuizQuestion.position"
+    )
 
 class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
+    __table_args__ = (
+        # position is the question id exposed per lesson (1, 2, 3, ...)
+        UniqueConstraint("lesson_id", "position", name="uq_quiz_questions_lesson_position"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    position = Column(Integer, nullable=False)
     question = Column(Text, nullable=False)
+    options = Column(JSON, nullable=False, default=list)
     correct_answer = Column(String, nullable=False)
 
     lesson = relationship("Lesson", back_populates="questions")
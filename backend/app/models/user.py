@@ -1,7 +1,7 @@
 # app/models/user.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, event, inspect, update
+from sqlalchemy.orm import relationship, object_session
 from datetime import datetime
 from app.models.conversation import ConversationHistory, ChatSession
 from app.db.database import Base
@@ -31,8 +31,8 @@ class User(Base):
 
 
     # Relationships
-    conversations = relationship("ConversationHistory", back_populates="user", cascade="all, delete-orphan")
-    chat_sessions = relationship(ChatSession, back_populates="user", cascade="all, delete-orphan")
+    conversations = relationship("ConversationHistory", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    chat_sessions = relationship(ChatSession, back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
     # NEW — Profile info
     display_name = Column(String, nullable=True)
@@ -48,3 +48,44 @@ class User(Base):
     total_sessions = Column(Integer, default=0)
     total_messages = Column(Integer, default=0)
     is_banned = Column(Boolean, default=False)
+    deleted_at = Column(DateTime, nullable=True)  # account deletion requested; purged in the background
+
+    # Version counters behind the ETags of /users/me and the session list
+    # (see app/utils/http_cache.py). row_version is bumped on every ORM update
+    # of the row; raw UPDATE statements on users must bump it themselves.
+    row_version = Column(Integer, nullable=False, default=1, server_default="1")
+    sessions_version = Column(Integer, nullable=False, default=1, server_default="1")
+
+
+def bump_sessions_version(user_id: int):
+    """UPDATE statement marking the user's chat-session list as changed."""
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(sessions_version=User.sessions_version + 1)
+    )
+
+
+@event.listens_for(User, "before_update")
+def _bump_row_version(mapper, connection, target):
+    session = object_session(target)
+    if session is None or session.is_modified(target, include_collections=False):
+        # Evaluated in the UPDATE itself, so concurrent writers can't reuse a version
+        target.row_version = User.row_version + 1
+
+
+# Fields of ChatSessionResponse; other columns (summary, ...) don't change the list
+_SESSION_LIST_FIELDS = ("title", "title_status", "user_id", "deleted_at")
+
+
+@event.listens_for(ChatSession, "after_insert")
+@event.listens_for(ChatSession, "after_delete")
+def _session_list_changed(mapper, connection, target):
+    connection.execute(bump_sessions_version(target.user_id))
+
+
+@event.listens_for(ChatSession, "after_update")
+def _session_list_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _SESSION_LIST_FIELDS):
+        connection.execute(bump_sessions_version(target.user_id))
@@ -0,0 +1,26 @@
+# backend/app/models/xp_ledger.py
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.database import Base
+
+
+class XpLedgerEntry(Base):
+    """
+    Append-only record of every XP change (see app/services/gamification_service.py).
+    balance_after is users.experience_points right after the change, so the
+    ledger of a user sums to their current XP.
+    """
+    __tablename__ = "xp_ledger"
+    __table_args__ = (
+        Index("ix_xp_ledger_user_id_created_at", "user_id", "created_at"),
+        # Windowed XP leaderboards are rebuilt from the entries of a period
+        Index("ix_xp_ledger_created_at", "created_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    balance_after = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -13,6 +13,7 @@ class ChatSessionResponse(BaseModel):
     id: int
     user_id: int
     title: str
+    title_status: Optional[str] = None
     created_at: datetime
 
     class Config:
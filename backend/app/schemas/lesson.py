@@ -11,12 +11,14 @@ class LessonType(str, Enum):
 class QuizQuestionBase(BaseModel):
     question: str
     correct_answer: str
+    options: List[str] = []
 
 class QuizQuestionCreate(QuizQuestionBase):
-    pass
+    position: Optional[int] = None  # defaults to the question's place in the list
 
 class QuizQuestion(QuizQuestionBase):
     id: int
+    position: int
     class Config:
         orm_mode = True
 
@@ -25,6 +27,7 @@ class LessonBase(BaseModel):
     description: Optional[str] = None
     type: LessonType
     context: Optional[str] = None
+    content: Optional[dict] = None
 
 class LessonCreate(LessonBase):
     questions: Optional[List[QuizQuestionCreate]] = None
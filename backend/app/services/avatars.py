@@ -0,0 +1,244 @@
+# app/services/avatars.py
+#
+# One pipeline for avatar uploads:
+#   0. UploadSizeLimitMiddleware (app/utils/uploads.py) refuses request bodies
+#      over AVATAR_MAX_REQUEST_BYTES before FastAPI spools them to disk.
+#   1. The upload is copied to a temp file in AVATAR_CHUNK_SIZE chunks while
+#      being hashed; more than AVATAR_MAX_BYTES aborts with 413.
+#   2. The file type comes from the first bytes (JPEG / PNG / WebP), not the
+#      client's content type.
+#   3. The file is stored as <sha256>.<ext> under AVATAR_DIR/<first two hex chars>/,
+#      so identical uploads share one file and a URL never changes content.
+#   4. Square WebP thumbnails (AVATAR_THUMBNAIL_SIZES) are rendered in a process
+#      pool with Pillow. The request does not wait for them: the URLs are returned
+#      right away and the files appear a moment later.
+# File system calls (temp file, rename, existence checks) run in worker threads.
+# Everything under /static/avatars is served with an immutable Cache-Control.
+# Files are never deleted on re-upload, since other users may share them.
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Dict, Optional
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+AVATAR_DIR = os.getenv("AVATAR_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "avatars"))
+AVATAR_URL_PREFIX = "/static/avatars"
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", 5 * 1024 * 1024))
+AVATAR_CHUNK_SIZE = 64 * 1024
+# Whole multipart request: the file plus room for the boundaries and part headers
+AVATAR_MAX_REQUEST_BYTES = AVATAR_MAX_BYTES + 64 * 1024
+AVATAR_TOO_LARGE = f"Avatar must be at most {AVATAR_MAX_BYTES // 1024} KB"
+AVATAR_THUMBNAIL_SIZES = tuple(int(s) for s in os.getenv("AVATAR_THUMBNAIL_SIZES", "64,128,256").split(","))
+AVATAR_THUMBNAIL_WORKERS = int(os.getenv("AVATAR_THUMBNAIL_WORKERS", 2))
+AVATAR_MAX_PIXELS = 40_000_000  # refuse decompression bombs
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+)
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _relative_dir(digest: str) -> str:
+    return digest[:2]
+
+
+def thumbnail_name(digest: str, size: int) -> str:
+    return f"{digest}_{size}.webp"
+
+
+# -------- Thumbnails (runs in the worker processes) --------
+def render_thumbnails(source: str, digest: str, sizes: tuple) -> list:
+    """Writes missing <digest>_<size>.webp files next to `source`; returns the sizes written."""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = AVATAR_MAX_PIXELS
+    directory = os.path.dirname(source)
+    written = []
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for size in sizes:
+            target = os.path.join(directory, thumbnail_name(digest, size))
+            if os.path.exists(target):
+                continue
+            thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            thumb.save(tmp, "WEBP", quality=85, method=4)
+            os.replace(tmp, target)
+            written.append(size)
+    return written
+
+
+# -------- File system steps (run in a worker thread) --------
+def _temp_file(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    os.close(fd)
+    return tmp_path
+
+
+def _move_into_place(tmp_path: str, path: str, digest: str):
+    """Renames the spooled file to `path` unless it exists; returns (deduplicated, missing thumbnail sizes)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    deduplicated = os.path.exists(path)
+    if deduplicated:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    missing = [s for s in AVATAR_THUMBNAIL_SIZES if not os.path.exists(os.path.join(directory, thumbnail_name(digest, s)))]
+    return deduplicated, tuple(missing)
+
+
+@dataclass
+class StoredAvatar:
+    digest: str
+    url: str
+    thumbnails: Dict[int, str]
+    deduplicated: bool
+
+
+class AvatarStore:
+    def __init__(self, directory: str = AVATAR_DIR, workers: int = AVATAR_THUMBNAIL_WORKERS):
+        self.directory = directory
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._rendering = {}  # future -> digest
+        self._stored = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._thumbnails_done = 0
+        self._thumbnails_failed = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def url_for(self, digest: str, name: str) -> str:
+        return f"{AVATAR_URL_PREFIX}/{_relative_dir(digest)}/{name}"
+
+    async def _spool(self, upload: UploadFile, directory: str):
+        """Copies the upload into a temp file; returns (temp_path, sha256 hex, extension)."""
+        tmp_path = await asyncio.to_thread(_temp_file, directory)
+        digest = hashlib.sha256()
+        size = 0
+        extension = None
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while True:
+                    chunk = await upload.read(AVATAR_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if extension is None:
+                        extension = sniff_extension(chunk)
+                        if extension is None:
+                            self._rejected += 1
+                            raise HTTPException(status_code=400, detail="Invalid file type")
+                    size += len(chunk)
+                    if size > AVATAR_MAX_BYTES:
+                        self._rejected += 1
+                        raise HTTPException(status_code=413, detail=AVATAR_TOO_LARGE)
+                    digest.update(chunk)
+                    await out.write(chunk)
+            if extension is None:
+                self._rejected += 1
+                raise HTTPException(status_code=400, detail="Empty file")
+        except BaseException:
+            await asyncio.to_thread(os.remove, tmp_path)
+            raise
+        return tmp_path, digest.hexdigest(), extension
+
+    async def store(self, upload: UploadFile) -> StoredAvatar:
+        tmp_path, digest, extension = await self._spool(upload, self.directory)
+
+        name = f"{digest}.{extension}"
+        path = os.path.join(self.directory, _relative_dir(digest), name)
+        deduplicated, missing = await asyncio.to_thread(_move_into_place, tmp_path, path, digest)
+        if deduplicated:
+            self._deduplicated += 1
+        else:
+            self._stored += 1
+
+        if missing and digest not in self._rendering.values():
+            self._schedule_thumbnails(path, digest, missing)
+
+        return StoredAvatar(
+            digest=digest,
+            url=self.url_for(digest, name),
+            thumbnails={s: self.url_for(digest, thumbnail_name(digest, s)) for s in AVATAR_THUMBNAIL_SIZES},
+            deduplicated=deduplicated,
+        )
+
+    def _schedule_thumbnails(self, path: str, digest: str, sizes: tuple):
+        try:
+            future = self._executor().submit(render_thumbnails, path, digest, sizes)
+        except BrokenProcessPool:
+            self._reset_pool()
+            future = self._executor().submit(render_thumbnails, path, digest, sizes)
+        future = asyncio.wrap_future(future)
+        self._rendering[future] = digest
+        future.add_done_callback(self._thumbnails_finished)
+
+    def _thumbnails_finished(self, future):
+        self._rendering.pop(future, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._thumbnails_failed += 1
+            logger.warning("Avatar thumbnail rendering failed: %s", error)
+            if isinstance(error, BrokenProcessPool):
+                self._reset_pool()
+        else:
+            self._thumbnails_done += 1
+
+    def _reset_pool(self):
+        # A crashed worker breaks the whole pool; start a fresh one on the next upload
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "stored": self._stored,
+            "deduplicated": self._deduplicated,
+            "rejected": self._rejected,
+            "thumbnails_pending": len(self._rendering),
+            "thumbnails_done": self._thumbnails_done,
+            "thumbnails_failed": self._thumbnails_failed,
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=False)
+                self._pool = None
+
+
+avatar_store = AvatarStore()
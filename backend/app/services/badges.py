@@ -0,0 +1,313 @@
+# app/services/badges.py
+#
+# Badges are declarative rules stored in the badges table:
+#   rule_type   metric                                    re-checked on
+#   xp          users.experience_points                   xp_gained
+#   messages    messages sent (leaderboard all-time)      message_sent
+#   streak      consecutive UTC days with a chat message  message_sent
+# Rules are indexed by the event they depend on, so an event only evaluates
+# the rules it can change, and only those the user hasn't earned yet.
+#
+# Evaluation runs in the job queue, never in the request. A chat turn calls
+# enqueue_badge_evaluation() inside its transaction. Per worker, that creates at
+# most one job per user every BADGE_EVALUATION_INTERVAL seconds: a burst of
+# messages shares one delayed job, which reads the state after the burst. Users
+# known (from the cache) to hold every badge their events can award are skipped.
+# Awarded badge ids are cached per user (LRU); inserts are idempotent, so a stale
+# cache in another worker costs at most a redundant check.
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import func, select
+from app.db.database import AsyncSessionLocal
+from app.db.upsert import dialect_insert
+from app.models.badge import Badge, UserBadge
+from app.models.leaderboard import LeaderboardScore
+from app.models.user import User
+from app.models.xp_ledger import XpLedgerEntry
+from app.services.job_queue import enqueue_job, register_job_handler
+
+logger = logging.getLogger(__name__)
+
+BADGE_EVALUATION_INTERVAL = float(os.getenv("BADGE_EVALUATION_INTERVAL", 30))  # seconds
+BADGE_RULES_TTL = float(os.getenv("BADGE_RULES_TTL", 60))  # seconds between rule reloads in job workers
+BADGE_CACHE_MAX_USERS = int(os.getenv("BADGE_CACHE_MAX_USERS", 10_000))
+
+BADGE_JOB = "evaluate_badges"
+
+# Events
+MESSAGE_SENT = "message_sent"
+XP_GAINED = "xp_gained"
+
+# rule_type -> the event that can change its metric
+RULE_EVENTS = {
+    "xp": XP_GAINED,
+    "messages": MESSAGE_SENT,
+    "streak": MESSAGE_SENT,
+}
+
+# Created by migration 0010 and by POST /setup-default-badges/
+DEFAULT_BADGES = [
+    {"name": "First 100 XP", "description": "You reached 100 XP!", "icon": "🏅", "rule_type": "xp", "threshold": 100},
+    {"name": "Chatterbox", "description": "You’ve sent 50 messages!", "icon": "💬", "rule_type": "messages", "threshold": 50},
+    {"name": "Level Up!", "description": "You reached your first new level!", "icon": "📈", "rule_type": "xp", "threshold": 100},
+    {"name": "On a Roll", "description": "You practised 3 days in a row!", "icon": "🔥", "rule_type": "streak", "threshold": 3},
+    {"name": "Week Warrior", "description": "You practised 7 days in a row!", "icon": "🗓️", "rule_type": "streak", "threshold": 7},
+]
+
+
+# -------- Metrics --------
+async def _xp(db, user_id: int, rules) -> int:
+    return (await db.execute(select(User.experience_points).where(User.id == user_id))).scalar() or 0
+
+
+async def _messages(db, user_id: int, rules) -> int:
+    return (await db.execute(
+        select(LeaderboardScore.score).where(
+            LeaderboardScore.board == "messages", LeaderboardScore.period == "all", LeaderboardScore.user_id == user_id
+        )
+    )).scalar() or 0
+
+
+async def _streak(db, user_id: int, rules) -> int:
+    """Consecutive UTC days with a chat message, ending today; looks back no further than the largest threshold."""
+    today = datetime.utcnow().date()
+    window = max(rule.threshold for rule in rules)
+    since = datetime(today.year, today.month, today.day) - timedelta(days=window - 1)
+    # Every chat message books XP, so the ledger (indexed on user_id, created_at) doubles as an activity log
+    days = {
+        str(day) for (day,) in (await db.execute(
+            select(func.date(XpLedgerEntry.created_at)).distinct()
+            .where(XpLedgerEntry.user_id == user_id, XpLedgerEntry.reason == "message", XpLedgerEntry.created_at >= since)
+        )).all()
+    }
+    streak = 0
+    while streak < window and (today - timedelta(days=streak)).isoformat() in days:
+        streak += 1
+    return streak
+
+
+METRICS = {
+    "xp": _xp,
+    "messages": _messages,
+    "streak": _streak,
+}
+
+
+# -------- Rules --------
+@dataclass(frozen=True)
+class BadgeRule:
+    badge_id: int
+    name: str
+    rule_type: str
+    threshold: int
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    rules: Tuple[BadgeRule, ...]
+    by_event: Mapping[str, Tuple[BadgeRule, ...]]
+    loaded_at: float
+
+    def for_events(self, events: Iterable[str]) -> List[BadgeRule]:
+        seen = {}
+        for event in events:
+            for rule in self.by_event.get(event, ()):
+                seen[rule.badge_id] = rule
+        return list(seen.values())
+
+
+EMPTY_RULES = RuleSet((), MappingProxyType({}), 0.0)
+
+
+def build_rules(badges) -> RuleSet:
+    rules = []
+    for badge in badges:
+        if badge.rule_type not in RULE_EVENTS:
+            logger.warning("Badge %r has unknown rule type %r; ignored", badge.name, badge.rule_type)
+            continue
+        rules.append(BadgeRule(badge.id, badge.name, badge.rule_type, badge.threshold))
+    by_event = {}
+    for rule in rules:
+        by_event.setdefault(RULE_EVENTS[rule.rule_type], []).append(rule)
+    return RuleSet(
+        rules=tuple(rules),
+        by_event=MappingProxyType({event: tuple(items) for event, items in by_event.items()}),
+        loaded_at=time.monotonic(),
+    )
+
+
+class BadgeRules:
+    def __init__(self):
+        self._rules: RuleSet = EMPTY_RULES
+        self._loaded = False
+
+    async def reload(self) -> RuleSet:
+        async with AsyncSessionLocal() as db:
+            badges = (await db.execute(select(Badge).order_by(Badge.id))).scalars().all()
+        self._rules = build_rules(badges)
+        self._loaded = True
+        return self._rules
+
+    async def current(self, max_age: Optional[float] = None) -> RuleSet:
+        if not self._loaded or (max_age is not None and time.monotonic() - self._rules.loaded_at > max_age):
+            await self.reload()
+        return self._rules
+
+    def peek(self) -> Optional[RuleSet]:
+        return self._rules if self._loaded else None
+
+
+badge_rules = BadgeRules()
+
+
+# -------- Awarded cache --------
+class AwardedCache:
+    """user_id -> frozenset of awarded badge ids, LRU-bounded."""
+
+    def __init__(self, max_users: int = BADGE_CACHE_MAX_USERS):
+        self.max_users = max_users
+        self._awarded: "OrderedDict[int, FrozenSet[int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, user_id: int) -> Optional[FrozenSet[int]]:
+        return self._awarded.get(user_id)
+
+    async def get(self, db, user_id: int) -> FrozenSet[int]:
+        awarded = self._awarded.get(user_id)
+        if awarded is not None:
+            self.hits += 1
+            self._awarded.move_to_end(user_id)
+            return awarded
+        self.misses += 1
+        awarded = frozenset((await db.execute(
+            select(UserBadge.badge_id).where(UserBadge.user_id == user_id)
+        )).scalars().all())
+        self._store(user_id, awarded)
+        return awarded
+
+    def add(self, user_id: int, badge_ids: Iterable[int]):
+        current = self._awarded.get(user_id)
+        if current is not None:
+            self._store(user_id, current | frozenset(badge_ids))
+
+    def _store(self, user_id: int, awarded: FrozenSet[int]):
+        self._awarded[user_id] = awarded
+        self._awarded.move_to_end(user_id)
+        while len(self._awarded) > self.max_users:
+            self._awarded.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._awarded.pop(user_id, None)
+
+
+awarded_cache = AwardedCache()
+
+
+# -------- Request side --------
+_scheduled: "OrderedDict[int, float]" = OrderedDict()  # user_id -> run time of the last job enqueued here
+_skipped = 0
+_enqueued = 0
+
+
+async def enqueue_badge_evaluation(db, user_id: int, events: Iterable[str]) -> bool:
+    """
+    Queue a badge check for `events` in the caller's transaction. Returns True
+    when a job was added (call notify_job_workers() after committing).
+    """
+    global _skipped, _enqueued
+    events = sorted(set(events))
+    rules = badge_rules.peek()
+    awarded = awarded_cache.peek(user_id)
+    if rules is not None and awarded is not None:
+        if all(rule.badge_id in awarded for rule in rules.for_events(events)):
+            _skipped += 1
+            return False
+
+    now = time.time()
+    last = _scheduled.get(user_id)
+    if last is not None and last > now:
+        # A job that hasn't run yet will see this event's data too
+        _skipped += 1
+        return False
+    run_at = max(now, last + BADGE_EVALUATION_INTERVAL) if last is not None else now
+    _scheduled[user_id] = run_at
+    _scheduled.move_to_end(user_id)
+    while len(_scheduled) > BADGE_CACHE_MAX_USERS:
+        _scheduled.popitem(last=False)
+    # Later events of the same burst are covered by this job, whatever events they carry
+    await enqueue_job(db, BADGE_JOB, {"user_id": user_id, "events": sorted(set(RULE_EVENTS.values()))}, delay=run_at - now)
+    _enqueued += 1
+    return True
+
+
+# -------- Job side --------
+async def evaluate_badges(user_id: int, events: Iterable[str]) -> List[str]:
+    """Awards every badge the events could have earned; returns the names of new badges."""
+    rules = await badge_rules.current(max_age=BADGE_RULES_TTL)
+    candidates = rules.for_events(events)
+    if not candidates:
+        return []
+    async with AsyncSessionLocal() as db:
+        awarded = await awarded_cache.get(db, user_id)
+        pending = [rule for rule in candidates if rule.badge_id not in awarded]
+        if not pending:
+            return []
+        by_type: Dict[str, List[BadgeRule]] = {}
+        for rule in pending:
+            by_type.setdefault(rule.rule_type, []).append(rule)
+        earned = []
+        for rule_type, type_rules in by_type.items():
+            value = await METRICS[rule_type](db, user_id, type_rules)
+            earned.extend(rule for rule in type_rules if value >= rule.threshold)
+        if not earned:
+            return []
+        now = datetime.utcnow()
+        stmt = dialect_insert(db.get_bind().dialect.name)(UserBadge).values([
+            {"user_id": user_id, "badge_id": rule.badge_id, "awarded_at": now} for rule in earned
+        ])
+        await db.execute(stmt.on_conflict_do_nothing(index_elements=["user_id", "badge_id"]))
+        await db.commit()
+    awarded_cache.add(user_id, (rule.badge_id for rule in earned))
+    names = [rule.name for rule in earned]
+    logger.info("Awarded badges to user_id=%s: %s", user_id, ", ".join(names))
+    return names
+
+
+@register_job_handler(BADGE_JOB)
+async def run_badge_job(payload: dict):
+    await evaluate_badges(payload["user_id"], payload["events"])
+
+
+# -------- Admin --------
+async def ensure_default_badges() -> int:
+    """Creates the DEFAULT_BADGES that don't exist yet (by name); returns how many were added."""
+    async with AsyncSessionLocal() as db:
+        existing = set((await db.execute(select(Badge.name))).scalars().all())
+        created = 0
+        for badge_data in DEFAULT_BADGES:
+            if badge_data["name"] not in existing:
+                db.add(Badge(**badge_data))
+                created += 1
+        await db.commit()
+    await badge_rules.reload()
+    return created
+
+
+def stats() -> dict:
+    rules = badge_rules.peek()
+    return {
+        "rules": len(rules.rules) if rules else None,
+        "cached_users": len(awarded_cache._awarded),
+        "cache_hits": awarded_cache.hits,
+        "cache_misses": awarded_cache.misses,
+        "evaluations_enqueued": _enqueued,
+        "evaluations_skipped": _skipped,
+    }
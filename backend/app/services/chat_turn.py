@@ -0,0 +1,171 @@
+# app/services/chat_turn.py
+#
+# Orchestrates one chat turn: a single query loads the session and its user,
+# the reply and the moderation hooks run concurrently, and the messages, XP,
+# level and title job are written in one transaction.
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.conversation import ChatSession
+from app.models.user import User
+from app.i18n.utils import get_error_message
+from app.services.chatbot_service import client, get_chatbot_response, build_system_prompt
+from app.services.context_builder import build_context
+from app.services.conversation_service import message_row
+from app.services.badges import enqueue_badge_evaluation, MESSAGE_SENT, XP_GAINED
+from app.services.gamification_service import handle_user_xp_and_level_up
+from app.services.job_queue import enqueue_job, notify_job_workers
+from app.services.message_writer import message_writer
+from app.services.principal import principal_cache
+from app.services.title_generator import TITLE_JOB
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODERATION_ENABLED = os.getenv("CHAT_MODERATION_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# async def hook(message: str, user: User) -> None; raise ChatTurnRejected to block the turn
+MODERATION_HOOKS = []
+
+
+class ChatTurnRejected(Exception):
+    # error_key is an app/i18n ERROR_MESSAGES key, shown to the user in their language
+    def __init__(self, error_key: str = "message_flagged"):
+        super().__init__(error_key)
+        self.error_key = error_key
+
+
+def register_moderation_hook(hook):
+    MODERATION_HOOKS.append(hook)
+    return hook
+
+
+if CHAT_MODERATION_ENABLED:
+    @register_moderation_hook
+    async def openai_moderation(message: str, user: User):
+        result = await client.moderations.create(input=message)
+        if result.results and result.results[0].flagged:
+            raise ChatTurnRejected("message_flagged")
+
+
+class StageTimer:
+    """Wall-clock duration of each named stage, in milliseconds."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (time.perf_counter() - start) * 1000
+
+    async def timed(self, name: str, awaitable):
+        with self.stage(name):
+            return await awaitable
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.stages.items())
+
+
+@dataclass
+class ChatTurnResult:
+    response: str
+    xp_earned: int
+    current_level: str
+    timings: StageTimer = field(default_factory=StageTimer)
+
+
+async def load_session_and_user(db: AsyncSession, chat_session_id: int, user_id: int, language: str = "English"):
+    row = (await db.execute(
+        select(ChatSession, User)
+        .join(User, User.id == ChatSession.user_id)
+        .where(ChatSession.id == chat_session_id, ChatSession.user_id == user_id, ChatSession.deleted_at.is_(None))
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=get_error_message("chat_session_not_found", language))
+    return row
+
+
+async def run_moderation(message: str, user: User):
+    if MODERATION_HOOKS:
+        await asyncio.gather(*(hook(message, user) for hook in MODERATION_HOOKS))
+
+
+async def persist_turn(db: AsyncSession, session: ChatSession, user: User, message: str, bot_response: str, language: str) -> int:
+    """
+    Write both messages, the XP/level change and any title or badge job. In the
+    default "direct" writer mode this is one commit; in "buffered" / "durable"
+    mode the messages go through the message writer's own batches instead.
+    """
+    await message_writer.write(db, [
+        message_row(user.id, "user", message, session.id),
+        message_row(user.id, "assistant", bot_response, session.id),
+    ], commit=False)
+
+    queued_title = False
+    if session.title_status == "pending":
+        # The title is produced by a background worker so the turn costs a single LLM call
+        await enqueue_job(db, TITLE_JOB, {
+            "chat_session_id": session.id,
+            "user_id": user.id,
+            "message": message,
+            "language": user.preferred_language or language
+        })
+        session.title_status = "queued"
+        queued_title = True
+
+    xp_earned = await handle_user_xp_and_level_up(user, len(message), db, commit=False)
+    events = (MESSAGE_SENT, XP_GAINED) if xp_earned else (MESSAGE_SENT,)
+    queued_badges = await enqueue_badge_evaluation(db, user.id, events)
+    await db.commit()
+    principal_cache.invalidate_user(user.id)
+    if queued_title or queued_badges:
+        notify_job_workers()
+    return xp_earned
+
+
+async def _cancel(task: asyncio.Task):
+    # Wait for the task to unwind: it may be using the request's session, which closes after we return
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+async def run_chat_turn(db: AsyncSession, message: str, user_id: int, chat_session_id: int, language: str = "English", use_cache: bool = True) -> ChatTurnResult:
+    timer = StageTimer()
+    session, user = await timer.timed("load", load_session_and_user(db, chat_session_id, user_id, language))
+
+    async def reply():
+        history = await timer.timed("context", build_context(db, session, build_system_prompt(language), message, language))
+        return await timer.timed("llm", get_chatbot_response(message, user_id, chat_session_id, language, history, use_cache))
+
+    with timer.stage("concurrent"):
+        reply_task = asyncio.create_task(reply())
+        try:
+            await timer.timed("moderation", run_moderation(message, user))
+        except ChatTurnRejected as e:
+            await _cancel(reply_task)
+            raise HTTPException(status_code=400, detail=get_error_message(e.error_key, language))
+        except BaseException:
+            await _cancel(reply_task)
+            raise
+        try:
+            bot_response = await reply_task
+        except Exception:
+            # Nothing is persisted: a failed reply must not be saved, rewarded or fed back as context
+            logger.exception("Chat reply failed (chat_session_id=%s)", chat_session_id)
+            raise HTTPException(status_code=502, detail=get_error_message("chat_response_failed", language))
+
+    xp_earned = await timer.timed("persist", persist_turn(db, session, user, message, bot_response, language))
+    return ChatTurnResult(bot_response, xp_earned, user.current_level, timer)
@@ -1,50 +1,107 @@
 import openai
 import os
 from dotenv import load_dotenv
-from app.services.conversation_service import save_message
-from app.db.database import SessionLocal
-from contextlib import contextmanager
 from app.schemas.user import UserOut
+from app.services.response_cache import response_cache
+from typing import AsyncIterator
 import asyncio
+import logging
 
 load_dotenv()
 
 client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
-@contextmanager
-def get_db_session():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+CHAT_MODEL = "gpt-3.5-turbo"
+
+def build_system_prompt(language: str = "English") -> str:
+    return (
+        f"You are a helpful language learning assistant. "
+        f"Always respond in {language}, and make sure the tone is encouraging and educational."
+    )
+
+def build_messages(system_prompt: str, message: str, history: list = None) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        *(history or []),
+        {"role": "user", "content": message}
+    ]
+
+# -------- Plain completion for internal prompts (summaries, titles) --------
+async def get_completion(messages: list, max_tokens: int = None) -> str:
+    options = {"max_tokens": max_tokens} if max_tokens else {}
+    completion = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        **options
+    )
+    return completion.choices[0].message.content.strip()
+
+async def get_chatbot_response(message: str, user_id: int, chat_session_id: int, language: str = "English", history: list = None, use_cache: bool = True) -> str:
+    # API errors propagate: the caller must not save or cache a failed turn
+    system_prompt = build_system_prompt(language)
+    # Only context-free turns are cacheable; with history the reply depends on the session
+    cacheable = use_cache and not history
+    if cacheable:
+        cached = await response_cache.get(language, system_prompt, message)
+        if cached is not None:
+            return cached
+    elif not use_cache:
+        response_cache.record_bypass()
+
+    # Persistence is left to the caller so a turn is written exactly once
+    completion = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=build_messages(system_prompt, message, history)
+    )
+
+    # Extract the response text
+    bot_message = completion.choices[0].message.content.strip()
+    # Same rule as the stream path: never cache an empty or cut-off reply
+    if cacheable and bot_message and completion.choices[0].finish_reason == "stop":
+        await response_cache.set(language, system_prompt, message, bot_message)
+    return bot_message
+
+# -------- Stream the reply token by token --------
+async def stream_chatbot_response(message: str, language: str = "English", history: list = None, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Yield the assistant reply as it is generated. Nothing is persisted here;
+    the caller saves the full reply once the stream is exhausted.
+    """
+    system_prompt = build_system_prompt(language)
+    cacheable = use_cache and not history
+    if cacheable:
+        cached = await response_cache.get(language, system_prompt, message)
+        if cached is not None:
+            yield cached
+            return
+    elif not use_cache:
+        response_cache.record_bypass()
+
+    stream = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=build_messages(system_prompt, message, history),
+        stream=True
+    )
+    parts = []
+    finish_reason = None
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            yield delta
+        finish_reason = chunk.choices[0].finish_reason or finish_reason
+    reply = "".join(parts).strip()
+    # Only a reply the model completed is worth serving again; an empty or cut-off one is not
+    if cacheable and reply and finish_reason == "stop":
+        await response_cache.set(language, system_prompt, message, reply)
 
-async def get_chatbot_response(message: str, user_id: int, chat_session_id: int, language: str = "English") -> str:
+# -------- Prime the shared HTTP connection pool at startup --------
+async def warm_up_client():
+    # A cheap authenticated GET opens (and keeps alive) the TLS connection to the API
     try:
-        system_prompt = (
-            f"You are a helpful language learning assistant. "
-            f"Always respond in {language}, and make sure the tone is encouraging and educational."
-        )
-        with get_db_session() as db:
-            # Save user's message
-            save_message(db, user_id, "user", message, chat_session_id)
-
-            # Create the chat completion asynchronously
-            completion = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ]
-            )
-            
-            # Extract the response text
-            bot_message = completion.choices[0].message.content.strip()
-
-            # Save bot's response
-            save_message(db, user_id, "assistant", bot_message, chat_session_id)
-
-            return bot_message
+        await client.models.list()
     except Exception as e:
-        print(f"Error in get_chatbot_response: {str(e)}")  # Add logging
-        return f"Error: {str(e)}"
+        logger.warning("OpenAI client warm-up failed: %s", e)
@@ -0,0 +1,116 @@
+# app/services/context_builder.py
+
+import logging
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.conversation import ChatSession
+from app.services.chatbot_service import CHAT_MODEL, get_completion
+from app.services.conversation_service import get_messages_between, get_recent_messages
+
+logger = logging.getLogger(__name__)
+
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 2000))
+CHAT_CONTEXT_MAX_TURNS = int(os.getenv("CHAT_CONTEXT_MAX_TURNS", 40))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", 250))
+# After an overflow, keep this share of the budget for verbatim turns so the
+# summary is not regenerated again on the very next turn
+CHAT_CONTEXT_KEEP_RATIO = float(os.getenv("CHAT_CONTEXT_KEEP_RATIO", 0.5))
+
+# Fixed per-message cost of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model(CHAT_MODEL)
+except Exception:  # not installed, or the encoding file can't be fetched
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # Rough fallback: ~4 characters per token for English-like text
+    return len(text) // 4 + 1
+
+
+def message_tokens(content: str) -> int:
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+async def summarize_turns(previous_summary: str, turns: list, language: str) -> str:
+    transcript = "\n".join(f"{turn.role}: {turn.message}" for turn in turns)
+    prompt = (
+        "Summarize this conversation between a language learner and their tutor so the tutor can continue it. "
+        "Keep the learner's goals, level, recurring mistakes and any open questions. "
+        f"Write at most {CHAT_SUMMARY_MAX_TOKENS // 2} words in {language}.\n\n"
+    )
+    if previous_summary:
+        prompt += f"Summary so far:\n{previous_summary}\n\n"
+    prompt += f"New turns:\n{transcript}"
+    return await get_completion([{"role": "user", "content": prompt}], max_tokens=CHAT_SUMMARY_MAX_TOKENS)
+
+
+async def _fold_into_summary(db: AsyncSession, session: ChatSession, before, language: str):
+    """Summarizes every turn after summary_until_id and before the (timestamp, id) cursor, oldest first."""
+    while True:
+        chunk = await get_messages_between(
+            db, session.user_id, session.id, session.summary_until_id, before, CHAT_CONTEXT_MAX_TURNS
+        )
+        if not chunk:
+            return
+        session.summary = await summarize_turns(session.summary, chunk, language)
+        session.summary_until_id = chunk[-1].id
+        await db.commit()
+        if len(chunk) < CHAT_CONTEXT_MAX_TURNS:
+            return
+
+
+async def build_context(db: AsyncSession, session: ChatSession, system_prompt: str, message: str, language: str = "English") -> list:
+    """
+    Return the history messages to send between the system prompt and the new
+    user message, fitted into CHAT_CONTEXT_TOKEN_BUDGET. Turns that no longer
+    fit are folded into the session's rolling summary.
+    """
+    budget = (
+        CHAT_CONTEXT_TOKEN_BUDGET
+        - message_tokens(system_prompt)
+        - message_tokens(message)
+        - CHAT_SUMMARY_MAX_TOKENS  # always leave room for the summary message
+    )
+
+    # Walk back through the unsummarized turns, CHAT_CONTEXT_MAX_TURNS per query, until the budget is full
+    kept, used, overflowed, cursor = [], 0, False, None
+    while not overflowed:
+        page = await get_recent_messages(
+            db, session.user_id, session.id, session.summary_until_id, CHAT_CONTEXT_MAX_TURNS, cursor
+        )
+        for turn in page:  # newest first
+            cost = message_tokens(turn.message)
+            if used + cost > budget:
+                overflowed = True
+                break
+            kept.append(turn)
+            used += cost
+        if len(page) < CHAT_CONTEXT_MAX_TURNS:
+            break
+        cursor = (page[-1].timestamp, page[-1].id)
+
+    if overflowed:
+        # Budget overflowed: shrink the verbatim window and fold everything older into the summary
+        target = budget * CHAT_CONTEXT_KEEP_RATIO
+        while kept and used > target:
+            used -= message_tokens(kept.pop().message)
+        oldest_kept = (kept[-1].timestamp, kept[-1].id) if kept else None
+        try:
+            await _fold_into_summary(db, session, oldest_kept, language)
+        except Exception as e:
+            # Keep answering with whatever fits; the rest is summarized on the next turn
+            logger.warning("Summary regeneration failed for chat_session_id=%s: %s", session.id, e)
+
+    history = []
+    if session.summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{session.summary}"})
+    history.extend({"role": turn.role, "content": turn.message} for turn in reversed(kept))
+    return history
@@ -1,11 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.conversation import ConversationHistory
 from app.models.conversation import ChatSession
+from app.services.platform_counters import increment_counters
+from app.services.leaderboard import record_messages
 from datetime import datetime
+import base64
+import binascii
 
 # -------- Save a message under a specific chat session --------
 
-def save_message(db: Session, user_id: int, role: str, message: str, chat_session_id: int):
+async def save_message(db: AsyncSession, user_id: int, role: str, message: str, chat_session_id: int):
     conversation = ConversationHistory(
         user_id=user_id,
         role=role,
@@ -13,43 +18,186 @@ def save_message(db: Session, user_id: int, role: str, message: str, chat_sessio
         chat_session_id=chat_session_id
     )
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
     return conversation
 
+def live_session(chat_session_id: int):
+    # Sessions pending deletion read as empty while their messages are being purged
+    return select(ChatSession.id).where(ChatSession.id == chat_session_id, ChatSession.deleted_at.is_(None)).exists()
+
 # -------- Fetch all messages for a specific session --------
-def get_user_conversations_by_session(db: Session, user_id: int, chat_session_id: int):
-    return db.query(ConversationHistory)\
-        .filter_by(user_id=user_id, chat_session_id=chat_session_id)\
-        .order_by(ConversationHistory.timestamp.asc())\
-        .all()
+async def get_user_conversations_by_session(db: AsyncSession, user_id: int, chat_session_id: int):
+    result = await db.execute(
+        select(ConversationHistory)
+        .filter_by(user_id=user_id, chat_session_id=chat_session_id)
+        .where(live_session(chat_session_id))
+        .order_by(ConversationHistory.timestamp.asc())
+    )
+    return result.scalars().all()
 
 # -------- Fetch all sessions for a user --------
-def get_chat_sessions_for_user(db: Session, user_id: int):
-    return db.query(ChatSession)\
-        .filter_by(user_id=user_id)\
-        .order_by(ChatSession.created_at.desc())\
-        .all()
+async def get_chat_sessions_for_user(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(ChatSession)
+        .filter_by(user_id=user_id, deleted_at=None)
+        .order_by(ChatSession.created_at.desc())
+    )
+    return result.scalars().all()
 
 # -------- Create a new chat session --------
-def create_chat_session(db: Session, user_id: int, title: str = None):
+async def create_chat_session(db: AsyncSession, user_id: int, title: str = None):
     session = ChatSession(user_id=user_id, title=title or "New Chat")
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
-# -------- Delete a specific chat session and its messages --------
-def delete_chat_session(db: Session, user_id: int, chat_session_id: int):
-    # First delete messages in the session
-    db.query(ConversationHistory).filter_by(user_id=user_id, chat_session_id=chat_session_id).delete()
-    # Then delete the session itself
-    db.query(ChatSession).filter_by(user_id=user_id, id=chat_session_id).delete()
-    db.commit()
-
 # -------- Get the latest message in a session --------
-def get_latest_conversation_message(db: Session, user_id: int, chat_session_id: int):
-    return db.query(ConversationHistory)\
-        .filter_by(user_id=user_id, chat_session_id=chat_session_id)\
-        .order_by(ConversationHistory.timestamp.desc())\
-        .first()
+async def get_latest_conversation_message(db: AsyncSession, user_id: int, chat_session_id: int):
+    result = await db.execute(
+        select(ConversationHistory)
+        .filter_by(user_id=user_id, chat_session_id=chat_session_id)
+        .order_by(ConversationHistory.timestamp.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+# -------- Most recent messages of a session, newest first --------
+async def get_recent_messages(db: AsyncSession, user_id: int, chat_session_id: int, after_id: int, limit: int, cursor=None):
+    # after_id: last message folded into the session summary; cursor: (timestamp, id) to page further back
+    query = select(ConversationHistory).filter_by(user_id=user_id, chat_session_id=chat_session_id)
+    if after_id is not None:
+        query = query.where(ConversationHistory.id > after_id)
+    if cursor is not None:
+        query = query.where(tuple_(ConversationHistory.timestamp, ConversationHistory.id) < tuple_(*cursor))
+    result = await db.execute(
+        query.order_by(ConversationHistory.timestamp.desc(), ConversationHistory.id.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+# -------- Oldest messages after after_id and before the (timestamp, id) cursor, oldest first --------
+async def get_messages_between(db: AsyncSession, user_id: int, chat_session_id: int, after_id: int, cursor, limit: int):
+    query = select(ConversationHistory).filter_by(user_id=user_id, chat_session_id=chat_session_id)
+    if after_id is not None:
+        query = query.where(ConversationHistory.id > after_id)
+    if cursor is not None:
+        query = query.where(tuple_(ConversationHistory.timestamp, ConversationHistory.id) < tuple_(*cursor))
+    result = await db.execute(
+        query.order_by(ConversationHistory.timestamp.asc(), ConversationHistory.id.asc()).limit(limit)
+    )
+    return result.scalars().all()
+
+# -------- Save several messages in one commit --------
+def message_row(user_id: int, role: str, message: str, chat_session_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "role": role,
+        "message": message,
+        "chat_session_id": chat_session_id,
+        "timestamp": datetime.utcnow(),
+    }
+
+async def record_inserted_messages(db: AsyncSession, rows: list):
+    # Core inserts bypass the ORM hooks that keep counters and leaderboards current
+    await increment_counters(db, {"messages": len(rows)})
+    await record_messages(db, rows)
+
+async def save_messages(db: AsyncSession, rows: list, commit: bool = True):
+    # Single round trip; callers that need generated ids should use save_message
+    if rows:
+        await db.execute(insert(ConversationHistory).values(rows))
+        await record_inserted_messages(db, rows)
+        if commit:
+            await db.commit()
+
+# -------- Keyset pagination over (timestamp, id) --------
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    # Raises ValueError on malformed input
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def message_to_dict(message: ConversationHistory) -> dict:
+    return {
+        "id": message.id,
+        "user_id": message.user_id,
+        "chat_session_id": message.chat_session_id,
+        "role": message.role,
+        "message": message.message,
+        "timestamp": message.timestamp,
+    }
+
+# -------- Page of sessions, newest first --------
+async def get_sessions_page(db: AsyncSession, user_id: int, cursor, limit: int):
+    query = select(ChatSession).filter_by(user_id=user_id, deleted_at=None)
+    if cursor is not None:
+        query = query.where(tuple_(ChatSession.created_at, ChatSession.id) < tuple_(*cursor))
+    result = await db.execute(
+        query.order_by(ChatSession.created_at.desc(), ChatSession.id.desc()).limit(limit + 1)
+    )
+    sessions = result.scalars().all()
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        next_cursor = encode_cursor(sessions[-1].created_at, sessions[-1].id)
+    return sessions, next_cursor
+
+# -------- First page of messages for several sessions in one query --------
+async def get_first_message_pages(db: AsyncSession, user_id: int, session_ids: list, limit: int):
+    pages = {session_id: ([], None) for session_id in session_ids}
+    if not session_ids:
+        return pages
+
+    row_number = func.row_number().over(
+        partition_by=ConversationHistory.chat_session_id,
+        order_by=(ConversationHistory.timestamp.asc(), ConversationHistory.id.asc())
+    ).label("row_number")
+    ranked = (
+        select(ConversationHistory.id, row_number)
+        .where(ConversationHistory.user_id == user_id, ConversationHistory.chat_session_id.in_(session_ids))
+        .subquery()
+    )
+    result = await db.execute(
+        select(ConversationHistory)
+        .join(ranked, ranked.c.id == ConversationHistory.id)
+        .where(ranked.c.row_number <= limit + 1)
+    )
+    # The result is bounded by len(session_ids) * (limit + 1), so order it here
+    grouped = {session_id: [] for session_id in session_ids}
+    for message in sorted(result.scalars(), key=lambda m: (m.timestamp, m.id)):
+        grouped[message.chat_session_id].append(message)
+
+    for session_id, messages in grouped.items():
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+        pages[session_id] = (messages, next_cursor)
+    return pages
+
+# -------- Page of messages in one session, oldest first --------
+async def get_messages_page(db: AsyncSession, user_id: int, chat_session_id: int, cursor, limit: int):
+    query = (
+        select(ConversationHistory)
+        .filter_by(user_id=user_id, chat_session_id=chat_session_id)
+        .where(live_session(chat_session_id))
+    )
+    if cursor is not None:
+        query = query.where(tuple_(ConversationHistory.timestamp, ConversationHistory.id) > tuple_(*cursor))
+    result = await db.execute(
+        query.order_by(ConversationHistory.timestamp.asc(), ConversationHistory.id.asc()).limit(limit + 1)
+    )
+    messages = result.scalars().all()
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+    return messages, next_cursor
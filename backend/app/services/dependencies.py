@@ -1,8 +1,7 @@
 from fastapi import Depends, HTTPException, status
-from app.services.auth import get_current_user
-from app.models.user import User
+from app.services.principal import Principal, get_current_principal
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_admin_user(current_user: Principal = Depends(get_current_principal)) -> Principal:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,5 +1,20 @@
-from sqlalchemy.orm import Session
+# app/services/gamification_service.py
+#
+# XP is applied in SQL: one UPDATE ... RETURNING adds the XP and sets the level
+# from a CASE over the thresholds, so concurrent chat turns of the same user
+# can't lose each other's XP. Every change is appended to xp_ledger in the same
+# transaction. Python-side level lookups bisect a threshold array built once.
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models.user import User
+from app.models.xp_ledger import XpLedgerEntry
+from app.services.leaderboard import record_xp_many
 
 # Define global XP thresholds with gamer-style level names
 LEVEL_THRESHOLDS = {
@@ -12,6 +27,11 @@ LEVEL_THRESHOLDS = {
     "Grandmaster": 1500,
 }
 
+# Sorted once; index i covers [_LEVEL_XP[i], _LEVEL_XP[i + 1])
+_LEVELS = sorted(LEVEL_THRESHOLDS.items(), key=lambda x: x[1])
+_LEVEL_NAMES = tuple(name for name, _ in _LEVELS)
+_LEVEL_XP = tuple(xp for _, xp in _LEVELS)
+
 
 def calculate_xp(message_length: int) -> int:
     """
@@ -23,27 +43,88 @@ def calculate_xp(message_length: int) -> int:
     return total_xp
 
 
-def add_experience_and_check_level_up(user: User, db: Session):
+def level_for_xp(xp: int) -> str:
+    return _LEVEL_NAMES[max(0, bisect_right(_LEVEL_XP, xp or 0) - 1)]
+
+
+def level_case(xp):
+    """SQL expression for the level of the XP expression `xp`."""
+    return case(
+        *[(xp >= required, name) for name, required in reversed(_LEVELS[1:])],
+        else_=_LEVEL_NAMES[0],
+    )
+
+
+def _sync_user(user: Optional[User], experience_points: int, current_level: str, row_version: int):
+    # Reflect the UPDATE on an already loaded user without marking it dirty
+    if user is not None:
+        set_committed_value(user, "experience_points", experience_points)
+        set_committed_value(user, "current_level", current_level)
+        set_committed_value(user, "row_version", row_version)
+
+
+async def apply_xp(db: AsyncSession, user_id: int, xp: int, reason: str, user: Optional[User] = None) -> Tuple[int, str]:
     """
-    Check if the user qualifies for a new level based on XP,
-    and update their current_level if needed.
+    Atomically add `xp` to a user in the caller's transaction and book it in
+    the ledger and leaderboards. Returns (new total, level).
     """
-    for level, xp_required in sorted(LEVEL_THRESHOLDS.items(), key=lambda x: x[1]):
-        if user.experience_points >= xp_required:
-            user.current_level = level
+    new_xp = func.coalesce(User.experience_points, 0) + xp
+    # Raw UPDATEs bypass the before_update hook, so row_version is bumped here
+    row = (await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(experience_points=new_xp, current_level=level_case(new_xp), row_version=User.row_version + 1)
+        .returning(User.experience_points, User.current_level, User.row_version)
+        .execution_options(synchronize_session=False)
+    )).one()
+    total, level, row_version = row
+    _sync_user(user, total, level, row_version)
+    await db.execute(insert(XpLedgerEntry).values(
+        user_id=user_id, delta=xp, balance_after=total, reason=reason, created_at=datetime.utcnow()
+    ))
+    await record_xp_many(db, [(user_id, xp, total)])
+    return total, level
+
 
-    db.commit()
-    db.refresh(user)
+async def apply_xp_bulk(db: AsyncSession, awards: Dict[int, int], reason: str) -> Dict[int, Tuple[int, str]]:
+    """
+    apply_xp() for many users ({user_id: xp}) with one UPDATE, one ledger
+    insert and two leaderboard upserts. Returns {user_id: (new total, level)}
+    for the users that exist.
+    """
+    awards = {user_id: xp for user_id, xp in awards.items() if xp}
+    if not awards:
+        return {}
+    new_xp = func.coalesce(User.experience_points, 0) + case(awards, value=User.id, else_=0)
+    rows = (await db.execute(
+        update(User)
+        .where(User.id.in_(awards))
+        .values(experience_points=new_xp, current_level=level_case(new_xp), row_version=User.row_version + 1)
+        .returning(User.id, User.experience_points, User.current_level, User.row_version)
+        .execution_options(synchronize_session=False)
+    )).all()
+    if not rows:
+        return {}
+    now = datetime.utcnow()
+    await db.execute(insert(XpLedgerEntry), [
+        {"user_id": user_id, "delta": awards[user_id], "balance_after": total, "reason": reason, "created_at": now}
+        for user_id, total, _, _ in rows
+    ])
+    await record_xp_many(db, [(user_id, awards[user_id], total) for user_id, total, _, _ in rows])
+    for user_id, total, level, row_version in rows:
+        _sync_user(db.identity_map.get(identity_key(User, user_id)), total, level, row_version)
+    return {user_id: (total, level) for user_id, total, level, _ in rows}
 
 
-def handle_user_xp_and_level_up(user: User, message_length: int, db: Session) -> int:
+async def handle_user_xp_and_level_up(user: User, message_length: int, db: AsyncSession, commit: bool = True) -> int:
     """
     Process XP gain from a message and check for level-up.
     Returns the amount of XP earned.
     """
     xp_earned = calculate_xp(message_length)
-    user.experience_points += xp_earned
-    add_experience_and_check_level_up(user, db)
+    await apply_xp(db, user.id, xp_earned, "message", user=user)
+    if commit:
+        await db.commit()
     return xp_earned
 
 def get_next_level_info(user: User) -> dict:
@@ -51,31 +132,15 @@ def get_next_level_info(user: User) -> dict:
     Returns the next level name and XP required to reach it.
     If user is at the highest level, returns None.
     """
-    current_xp = user.experience_points
-    sorted_levels = sorted(LEVEL_THRESHOLDS.items(), key=lambda x: x[1])
-
-    for level, xp_required in sorted_levels:
-        if current_xp < xp_required:
-            return {
-                "next_level": level,
-                "xp_needed": xp_required - current_xp
-            }
+    current_xp = user.experience_points or 0
+    index = bisect_right(_LEVEL_XP, current_xp)
+    if index < len(_LEVEL_XP):
+        return {
+            "next_level": _LEVEL_NAMES[index],
+            "xp_needed": _LEVEL_XP[index] - current_xp
+        }
 
     return {
         "next_level": None,
         "xp_needed": 0  # Already at max level
     }
-
-#def award_badge_if_eligible(user: User, db: Session):
-#    badges_to_award = []
-
-#    # Example 1: Award for reaching 100 XP
-#    if user.experience_points >= 100:
-#        badge = db.query(Badge).filter(Badge.name == "First 100 XP").first()
-#        if badge and not any(ub.badge_id == badge.id for ub in user.badges):
- #           user_badge = UserBadge(user_id=user.id, badge_id=badge.id)
- #           db.add(user_badge)
-  #          badges_to_award.append(badge.name)
-#
- #   db.commit()
- #   return badges_to_award
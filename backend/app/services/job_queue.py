@@ -0,0 +1,253 @@
+# app/services/job_queue.py
+#
+# Durable job queue backed by the background_jobs table, so it needs no
+# external broker. Jobs are claimed with an optimistic UPDATE (plus
+# SKIP LOCKED on Postgres), retried with exponential backoff, and reclaimed
+# if a worker dies while holding one. A job lost on its last attempt is marked
+# failed instead of being reclaimed again. Done jobs are deleted after
+# JOB_RETENTION_DAYS by an idle worker, in batches, so the table the claim query
+# runs over stays small; failed jobs are kept for inspection.
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import AsyncSessionLocal
+from app.models.job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2.0))  # seconds
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", 5.0))  # seconds, doubled per attempt
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", 300))  # seconds before a running job is reclaimed
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", 7))
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", 3600))  # seconds between sweeps per process
+JOB_SWEEP_BATCH_SIZE = int(os.getenv("JOB_SWEEP_BATCH_SIZE", 1000))
+JOB_SWEEP_MAX_BATCHES = int(os.getenv("JOB_SWEEP_MAX_BATCHES", 50))
+
+# kind -> (handler, on_failure)
+_handlers = {}
+_wakeup = None
+_workers = []
+_last_sweep = None
+
+
+def register_job_handler(kind: str, on_failure=None):
+    """
+    Register `async def handler(payload)` for a job kind. `on_failure(payload, error)`
+    runs once the job has used up all its attempts.
+    """
+    def decorator(handler):
+        _handlers[kind] = (handler, on_failure)
+        return handler
+    return decorator
+
+
+async def enqueue_job(db: AsyncSession, kind: str, payload: dict, max_attempts: int = 5, delay: float = 0) -> BackgroundJob:
+    # Added to the caller's transaction; it becomes visible to workers on commit
+    job = BackgroundJob(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.add(job)
+    return job
+
+
+def notify_job_workers():
+    # Call after committing enqueued jobs so local workers pick them up immediately
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _claim_job():
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        query = (
+            select(BackgroundJob.id, BackgroundJob.attempts)
+            .where(or_(
+                and_(BackgroundJob.status == "queued", BackgroundJob.run_after <= now),
+                and_(
+                    BackgroundJob.status == "running",
+                    BackgroundJob.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT),
+                    BackgroundJob.attempts < BackgroundJob.max_attempts,
+                ),
+            ))
+            .order_by(BackgroundJob.id)
+            .limit(1)
+        )
+        if db.bind.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        candidate = (await db.execute(query)).first()
+        if candidate is None:
+            await db.rollback()
+            return None
+
+        # attempts acts as a version number, so only one worker wins the claim
+        result = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == candidate.id, BackgroundJob.attempts == candidate.attempts)
+            .values(status="running", attempts=candidate.attempts + 1, locked_at=now, updated_at=now)
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            return None
+        return await db.get(BackgroundJob, candidate.id)
+
+
+async def _finish_job(job: BackgroundJob, error: Exception = None):
+    now = datetime.utcnow()
+    values = {"locked_at": None, "updated_at": now}
+    if error is None:
+        values.update(status="done", last_error=None)
+    elif job.attempts < job.max_attempts:
+        delay = JOB_RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+        values.update(status="queued", last_error=str(error), run_after=now + timedelta(seconds=delay))
+    else:
+        values.update(status="failed", last_error=str(error))
+
+    async with AsyncSessionLocal() as db:
+        # attempts still matching means no other worker has reclaimed the job meanwhile
+        result = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job.id, BackgroundJob.attempts == job.attempts)
+            .values(**values)
+        )
+        await db.commit()
+    if result.rowcount != 1:
+        logger.warning("Job %s (%s) was reclaimed by another worker; result of attempt %s discarded", job.id, job.kind, job.attempts)
+        return None
+    return values["status"]
+
+
+async def _fail_abandoned_jobs():
+    # Jobs whose worker died or hung on their last attempt are not reclaimed again
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        abandoned = (await db.execute(
+            select(BackgroundJob.id, BackgroundJob.kind, BackgroundJob.payload, BackgroundJob.attempts)
+            .where(
+                BackgroundJob.status == "running",
+                BackgroundJob.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT),
+                BackgroundJob.attempts >= BackgroundJob.max_attempts,
+            )
+            .limit(100)
+        )).all()
+        failed = []
+        for job in abandoned:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job.id, BackgroundJob.attempts == job.attempts, BackgroundJob.status == "running")
+                .values(status="failed", locked_at=None, updated_at=now, last_error="Worker lost while running the last attempt")
+            )
+            if result.rowcount == 1:
+                failed.append(job)
+        await db.commit()
+
+    for job in failed:
+        logger.error("Job %s (%s) failed: worker lost on its last attempt", job.id, job.kind)
+        on_failure = _handlers.get(job.kind, (None, None))[1]
+        if on_failure is not None:
+            try:
+                await on_failure(job.payload, RuntimeError("worker lost"))
+            except Exception as hook_error:
+                logger.error("Failure hook for job %s failed: %s", job.id, hook_error)
+
+
+async def sweep_finished_jobs() -> int:
+    """Deletes done jobs older than JOB_RETENTION_DAYS, one batch per transaction; returns how many."""
+    # run_after is when the last attempt became due, just before the job finished,
+    # so the (status, run_after) index serves the sweep too
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    deleted = 0
+    for _ in range(JOB_SWEEP_MAX_BATCHES):
+        async with AsyncSessionLocal() as db:
+            ids = (
+                select(BackgroundJob.id)
+                .where(BackgroundJob.status == "done", BackgroundJob.run_after < cutoff)
+                .limit(JOB_SWEEP_BATCH_SIZE)
+            )
+            result = await db.execute(delete(BackgroundJob).where(BackgroundJob.id.in_(ids)))
+            await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < JOB_SWEEP_BATCH_SIZE:
+            break
+    if deleted:
+        logger.info("Deleted %s finished jobs", deleted)
+    return deleted
+
+
+async def _maybe_sweep():
+    # One sweep per JOB_SWEEP_INTERVAL per process, run by whichever worker goes idle first
+    global _last_sweep
+    now = time.monotonic()
+    if _last_sweep is not None and now - _last_sweep < JOB_SWEEP_INTERVAL:
+        return
+    _last_sweep = now
+    await sweep_finished_jobs()
+
+
+async def run_next_job() -> bool:
+    job = await _claim_job()
+    if job is None:
+        await _fail_abandoned_jobs()
+        return False
+
+    handler, on_failure = _handlers.get(job.kind, (None, None))
+    if handler is None:
+        await _finish_job(job, RuntimeError(f"No handler registered for job kind '{job.kind}'"))
+        return True
+
+    try:
+        await handler(job.payload)
+    except Exception as e:
+        logger.warning("Job %s (%s) attempt %s failed: %s", job.id, job.kind, job.attempts, e)
+        status = await _finish_job(job, e)
+        if status == "failed" and on_failure is not None:
+            try:
+                await on_failure(job.payload, e)
+            except Exception as hook_error:
+                logger.error("Failure hook for job %s failed: %s", job.id, hook_error)
+        return True
+
+    await _finish_job(job)
+    return True
+
+
+async def _worker_loop():
+    while True:
+        try:
+            while await run_next_job():
+                pass
+            await _maybe_sweep()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Job worker error: %s", e)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_job_workers(count: int = JOB_WORKERS):
+    global _wakeup
+    if _workers:
+        return
+    _wakeup = asyncio.Event()
+    for _ in range(count):
+        _workers.append(asyncio.create_task(_worker_loop()))
+
+
+async def stop_job_workers():
+    # Jobs interrupted here are picked up again after JOB_LOCK_TIMEOUT
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,387 @@
+# app/services/leaderboard.py
+#
+# Leaderboards for messages sent and XP, all-time plus the current ISO week
+# and calendar month (UTC).
+#
+# leaderboard_scores holds the persisted scores and is updated in the same
+# transaction as the write that earns them:
+#   - messages: ORM inserts/deletes via an after_flush hook, Core bulk inserts
+#     via record_messages() and Core deletes via record_message_deletions().
+#     A deleted message comes off all-time and off the current week / month
+#     only if it was sent in them
+#   - xp: record_xp_many() from gamification_service
+# Each worker mirrors the current periods in memory as sorted rankings, which
+# makes top-N O(log n + N) and "my rank" O(log n). Workers pull changed rows
+# every LEADERBOARD_REFRESH_INTERVAL seconds, so a score shows up everywhere
+# within one interval. rebuild() recomputes a board from the source tables.
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+from sqlalchemy import event, delete, func, literal, select, text
+from sqlalchemy.orm import Session
+from app.db.database import AsyncSessionLocal
+from app.db.upsert import dialect_insert, upsert_add
+from app.models.conversation import ConversationHistory
+from app.models.leaderboard import LeaderboardScore
+from app.models.user import User
+from app.models.xp_ledger import XpLedgerEntry
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", 5))  # seconds, 0 disables
+# Re-read rows this far behind the last refresh; transactions can commit after
+# the timestamp they wrote. Re-applying a row is idempotent.
+LEADERBOARD_REFRESH_OVERLAP = timedelta(seconds=float(os.getenv("LEADERBOARD_REFRESH_OVERLAP", 30)))
+_REBUILD_LOCK_ID = 7317002
+
+OPENING_BALANCE = "opening_balance"  # xp_ledger reason of the entries booked by migration 0009
+
+BOARDS = ("messages", "xp")
+PERIODS = ("all", "week", "month")
+
+
+def period_key(period: str, now: Optional[datetime] = None) -> str:
+    now = now or datetime.utcnow()
+    if period == "week":
+        iso_year, iso_week, _ = now.isocalendar()
+        return f"week:{iso_year}-W{iso_week:02d}"
+    if period == "month":
+        return f"month:{now:%Y-%m}"
+    return "all"
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    now = now or datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    if period == "week":
+        return today - timedelta(days=now.isocalendar()[2] - 1)
+    if period == "month":
+        return datetime(now.year, now.month, 1)
+    return None
+
+
+def current_period_keys(now: Optional[datetime] = None) -> List[str]:
+    return [period_key(period, now) for period in PERIODS]
+
+
+# -------- Write paths --------
+def _score_rows(board: str, deltas: Dict[int, int], now: datetime, windowed: bool) -> list:
+    periods = current_period_keys(now) if windowed else ["all"]
+    return [
+        {"board": board, "period": period, "user_id": user_id, "score": delta, "updated_at": now}
+        for user_id, delta in deltas.items() if delta
+        for period in periods
+    ]
+
+
+def _deletion_rows(deleted: List[Tuple[int, datetime]], now: datetime) -> list:
+    """Deleted (user_id, timestamp) messages come off all-time and off the current windows they were sent in."""
+    current = set(current_period_keys(now))
+    deltas = Counter()
+    for user_id, timestamp in deleted:
+        if not user_id:
+            continue
+        deltas[(user_id, "all")] -= 1
+        for period in ("week", "month"):
+            key = period_key(period, timestamp)
+            if key in current:
+                deltas[(user_id, key)] -= 1
+    return [
+        {"board": "messages", "period": key, "user_id": user_id, "score": delta, "updated_at": now}
+        for (user_id, key), delta in deltas.items()
+    ]
+
+
+def _message_upsert(dialect_name: str, added: Dict[int, int], deleted: List[Tuple[int, datetime]] = ()):
+    """New messages per user count towards every current period; see _deletion_rows() for deletions."""
+    now = datetime.utcnow()
+    rows = _score_rows("messages", added, now, windowed=True) + _deletion_rows(deleted, now)
+    if not rows:
+        return None
+    return upsert_add(
+        dialect_name, LeaderboardScore, rows, ["board", "period", "user_id"], "score", extra_set=["updated_at"]
+    )
+
+
+async def record_messages(db, rows: list):
+    """For Core bulk inserts of conversation_history rows, in the caller's transaction."""
+    stmt = _message_upsert(db.get_bind().dialect.name, Counter(row["user_id"] for row in rows if row.get("user_id")))
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def record_message_deletions(db, deleted: List[Tuple[int, datetime]]):
+    """For Core deletes of conversation_history rows: their (user_id, timestamp) pairs."""
+    stmt = _message_upsert(db.get_bind().dialect.name, {}, deleted)
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def record_xp_many(db, awards: List[Tuple[int, int, int]]):
+    """
+    XP awarded in the caller's transaction, as (user_id, xp_earned, total_xp):
+    all-time is the user's total, windows accumulate. Two statements in total.
+    """
+    awards = [award for award in awards if award[1]]
+    if not awards:
+        return
+    dialect_name = db.get_bind().dialect.name
+    now = datetime.utcnow()
+    windows = [
+        {"board": "xp", "period": key, "user_id": user_id, "score": xp_earned, "updated_at": now}
+        for user_id, xp_earned, _ in awards
+        for key in current_period_keys(now) if key != "all"
+    ]
+    await db.execute(upsert_add(
+        dialect_name, LeaderboardScore, windows, ["board", "period", "user_id"], "score", extra_set=["updated_at"]
+    ))
+    stmt = dialect_insert(dialect_name)(LeaderboardScore).values([
+        {"board": "xp", "period": "all", "user_id": user_id, "score": total_xp, "updated_at": now}
+        for user_id, _, total_xp in awards
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["board", "period", "user_id"],
+        set_={"score": stmt.excluded.score, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+@event.listens_for(Session, "after_flush")
+def _count_orm_messages(session, flush_context):
+    added = Counter()
+    for obj in session.new:
+        if isinstance(obj, ConversationHistory) and obj.user_id:
+            added[obj.user_id] += 1
+    deleted = [
+        (obj.user_id, obj.timestamp or datetime.utcnow())
+        for obj in session.deleted if isinstance(obj, ConversationHistory) and obj.user_id
+    ]
+    if added or deleted:
+        stmt = _message_upsert(session.get_bind().dialect.name, added, deleted)
+        if stmt is not None:
+            session.connection().execute(stmt)
+
+
+# -------- In-memory rankings --------
+class Ranking:
+    """Scores ordered by (-score, user_id); ties share the same (competition) rank."""
+
+    def __init__(self):
+        self._sorted = SortedList()
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def set(self, user_id: int, score: int):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._sorted.remove((-old, user_id))
+        if score > 0:
+            self._scores[user_id] = score
+            self._sorted.add((-score, user_id))
+
+    def rank_of_score(self, score: int) -> int:
+        return self._sorted.bisect_left((-score,)) + 1
+
+    def top(self, n: int) -> List[Tuple[int, int, int]]:
+        """[(rank, user_id, score), ...]"""
+        return [
+            (self.rank_of_score(-neg_score), user_id, -neg_score)
+            for neg_score, user_id in self._sorted.islice(0, n)
+        ]
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, int]]:
+        """(rank, score), or None if the user has no score in this period."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self.rank_of_score(score), score
+
+
+class Leaderboards:
+    def __init__(self):
+        self._rankings: Dict[Tuple[str, str], Ranking] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._last_refresh: Optional[datetime] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _load(self, board: str, key: str) -> Ranking:
+        ranking = Ranking()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(LeaderboardScore.user_id, LeaderboardScore.score)
+                .where(LeaderboardScore.board == board, LeaderboardScore.period == key)
+            )
+            for user_id, score in result.all():
+                ranking.set(user_id, score)
+        return ranking
+
+    async def ranking(self, board: str, period: str) -> Ranking:
+        key = (board, period_key(period))
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            async with self._get_lock():
+                ranking = self._rankings.get(key)
+                if ranking is None:
+                    if self._last_refresh is None:
+                        self._last_refresh = datetime.utcnow()
+                    ranking = await self._load(*key)
+                    self._rankings[key] = ranking
+                    self._drop_stale_periods()
+        return ranking
+
+    def _drop_stale_periods(self):
+        current = set(current_period_keys())
+        for key in [key for key in self._rankings if key[1] not in current]:
+            del self._rankings[key]
+
+    async def refresh(self):
+        """Applies rows changed by any worker since the last refresh."""
+        if self._last_refresh is None or not self._rankings:
+            return
+        started = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(LeaderboardScore.board, LeaderboardScore.period, LeaderboardScore.user_id, LeaderboardScore.score)
+                .where(LeaderboardScore.updated_at >= self._last_refresh - LEADERBOARD_REFRESH_OVERLAP)
+            )
+            rows = result.all()
+        for board, key, user_id, score in rows:
+            ranking = self._rankings.get((board, key))
+            if ranking is not None:
+                ranking.set(user_id, score)
+        self._last_refresh = started
+        self._drop_stale_periods()
+
+    def invalidate(self, board: Optional[str] = None):
+        for key in [key for key in self._rankings if board is None or key[0] == board]:
+            del self._rankings[key]
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(LEADERBOARD_REFRESH_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Leaderboard refresh failed: %s", e)
+
+    def start(self):
+        if LEADERBOARD_REFRESH_INTERVAL > 0 and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    def stats(self) -> dict:
+        return {
+            "rankings": {f"{board}/{key}": len(ranking) for (board, key), ranking in self._rankings.items()},
+            "last_refresh": self._last_refresh,
+        }
+
+
+leaderboards = Leaderboards()
+
+
+# -------- Queries --------
+async def get_top(board: str, period: str, limit: int) -> List[dict]:
+    ranking = await leaderboards.ranking(board, period)
+    entries = ranking.top(limit)
+    if not entries:
+        return []
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id, User.username, User.display_name).where(User.id.in_([e[1] for e in entries]))
+        )
+        names = {row.id: row for row in result.all()}
+    return [
+        {
+            "rank": rank,
+            "user_id": user_id,
+            "username": names[user_id].username if user_id in names else None,
+            "display_name": names[user_id].display_name if user_id in names else None,
+            "score": score,
+        }
+        for rank, user_id, score in entries
+    ]
+
+
+async def get_rank(board: str, period: str, user_id: int) -> dict:
+    ranking = await leaderboards.ranking(board, period)
+    position = ranking.rank(user_id)
+    return {
+        "board": board,
+        "period": period_key(period),
+        "user_id": user_id,
+        "rank": position[0] if position else None,
+        "score": position[1] if position else 0,
+        "participants": len(ranking),
+    }
+
+
+# -------- Rebuild from source tables --------
+async def rebuild(board: str) -> dict:
+    """
+    Recomputes the current periods of a board from the source tables and
+    reloads it. Windowed XP is summed from the xp_ledger entries of the period
+    (opening balances excluded). Other workers pick up the rebuilt rows on their next refresh; entries that
+    the rebuild removed stay in their memory until the period rolls over.
+    """
+    now = datetime.utcnow()
+    rebuilt = {}
+    async with AsyncSessionLocal() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _REBUILD_LOCK_ID})
+        sources = []
+        if board == "messages":
+            for period in PERIODS:
+                query = (
+                    select(
+                        literal("messages"), literal(period_key(period, now)),
+                        ConversationHistory.user_id, func.count(), literal(now),
+                    )
+                    .where(ConversationHistory.user_id.isnot(None))
+                    .group_by(ConversationHistory.user_id)
+                )
+                since = period_start(period, now)
+                if since is not None:
+                    query = query.where(ConversationHistory.timestamp >= since)
+                sources.append((period_key(period, now), query))
+        elif board == "xp":
+            sources.append(("all", select(
+                literal("xp"), literal("all"), User.id, User.experience_points, literal(now),
+            ).where(User.experience_points > 0)))
+            for period in PERIODS[1:]:
+                key = period_key(period, now)
+                sources.append((key, select(
+                    literal("xp"), literal(key), XpLedgerEntry.user_id, func.sum(XpLedgerEntry.delta), literal(now),
+                )
+                    .where(XpLedgerEntry.created_at >= period_start(period, now), XpLedgerEntry.reason != OPENING_BALANCE)
+                    .group_by(XpLedgerEntry.user_id)
+                    .having(func.sum(XpLedgerEntry.delta) != 0)))
+        else:
+            raise ValueError(f"Unknown leaderboard: {board}")
+
+        columns = ["board", "period", "user_id", "score", "updated_at"]
+        for key, query in sources:
+            await db.execute(delete(LeaderboardScore).where(LeaderboardScore.board == board, LeaderboardScore.period == key))
+            result = await db.execute(LeaderboardScore.__table__.insert().from_select(columns, query))
+            rebuilt[key] = result.rowcount
+        await db.commit()
+    leaderboards.invalidate(board)
+    return rebuilt
@@ -0,0 +1,152 @@
+# app/services/lesson_catalog.py
+#
+# The lesson catalog is small, read on every lessons page and quiz answer, and
+# changes only when an admin adds a lesson. Readers therefore use an immutable
+# in-memory snapshot instead of the database:
+#   - lessons: tuple of lesson dicts in API shape (what GET /lessons returns)
+#   - by_id: lesson_id -> lesson dict
+#   - answers: (lesson_id, question_id) -> correct answer, quiz questions only
+# A reload builds a complete new snapshot and swaps one reference, so readers
+# see either the old or the new catalog, never a mix. Other workers pick up
+# changes by polling a cheap fingerprint every LESSON_CATALOG_REFRESH_INTERVAL.
+# Treat snapshot contents as read-only.
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from app.db.database import AsyncSessionLocal
+from app.models.lesson import Lesson, LessonType, QuizQuestion
+
+logger = logging.getLogger(__name__)
+
+LESSON_CATALOG_REFRESH_INTERVAL = float(os.getenv("LESSON_CATALOG_REFRESH_INTERVAL", 30))  # seconds, 0 disables
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int        # local reload counter
+    digest: str         # content hash, identical across workers for the same catalog
+    fingerprint: tuple  # cheap DB-side change detector
+    lessons: Tuple[dict, ...]
+    by_id: Mapping[int, dict]
+    answers: Mapping[Tuple[int, int], str]
+    quiz_ids: frozenset
+
+
+EMPTY_SNAPSHOT = CatalogSnapshot(0, "", (), (), MappingProxyType({}), MappingProxyType({}), frozenset())
+
+
+def lesson_to_dict(lesson: Lesson) -> dict:
+    """API shape: scenario lessons are exposed as type "dialog"."""
+    if lesson.type == LessonType.QUIZ:
+        content = {
+            "questions": [
+                {"id": q.position, "question": q.question, "options": list(q.options or []), "correct_answer": q.correct_answer}
+                for q in lesson.questions
+            ]
+        }
+        lesson_type = "quiz"
+    else:
+        content = dict(lesson.content or {})
+        if lesson.context and "scenario" not in content:
+            content["scenario"] = lesson.context
+        lesson_type = "dialog"
+    return {
+        "id": lesson.id,
+        "title": lesson.title,
+        "description": lesson.description or "",
+        "type": lesson_type,
+        "content": content,
+    }
+
+
+def build_snapshot(lessons, version: int, fingerprint: tuple) -> CatalogSnapshot:
+    items = tuple(lesson_to_dict(lesson) for lesson in lessons)
+    answers = {}
+    quiz_ids = set()
+    for item in items:
+        if item["type"] == "quiz":
+            quiz_ids.add(item["id"])
+            for q in item["content"]["questions"]:
+                answers[(item["id"], q["id"])] = q["correct_answer"]
+    digest = hashlib.sha1(json.dumps(items, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return CatalogSnapshot(
+        version=version,
+        digest=digest,
+        fingerprint=fingerprint,
+        lessons=items,
+        by_id=MappingProxyType({item["id"]: item for item in items}),
+        answers=MappingProxyType(answers),
+        quiz_ids=frozenset(quiz_ids),
+    )
+
+
+async def _fingerprint(db) -> tuple:
+    lessons = (await db.execute(select(func.count(Lesson.id), func.max(Lesson.id)))).one()
+    questions = (await db.execute(select(func.count(QuizQuestion.id), func.max(QuizQuestion.id)))).one()
+    return tuple(lessons) + tuple(questions)
+
+
+class LessonCatalog:
+    def __init__(self):
+        self._snapshot: CatalogSnapshot = EMPTY_SNAPSHOT
+        self._loaded = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def reload(self) -> CatalogSnapshot:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                fingerprint = await _fingerprint(db)
+                result = await db.execute(
+                    select(Lesson).options(selectinload(Lesson.questions)).order_by(Lesson.id)
+                )
+                lessons = result.scalars().all()
+            self._snapshot = build_snapshot(lessons, self._snapshot.version + 1, fingerprint)
+            self._loaded = True
+        return self._snapshot
+
+    async def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot; loads it on first use."""
+        if not self._loaded:
+            await self.reload()
+        return self._snapshot
+
+    async def refresh_if_changed(self):
+        async with AsyncSessionLocal() as db:
+            fingerprint = await _fingerprint(db)
+        if fingerprint != self._snapshot.fingerprint:
+            await self.reload()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(LESSON_CATALOG_REFRESH_INTERVAL)
+            try:
+                await self.refresh_if_changed()
+            except Exception as e:
+                logger.warning("Lesson catalog refresh failed: %s", e)
+
+    def start(self):
+        if LESSON_CATALOG_REFRESH_INTERVAL > 0 and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+
+lesson_catalog = LessonCatalog()
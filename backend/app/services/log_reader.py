@@ -0,0 +1,386 @@
+# app/services/log_reader.py
+#
+# Newest-first queries over a log file and its rotated backups
+# (app.log, app.log.1 / app.log.1.gz, app.log.2 ...) without loading them.
+#
+# - Plain files are read backwards in LOG_READ_BLOCK_SIZE blocks from the
+#   requested position, so a page from the end of a large log costs a few reads.
+# - gzip backups cannot seek backwards; they are streamed forward once while a
+#   deque keeps only the newest `limit` matches, so memory stays bounded.
+# - Filters (minimum level, user_id, since/until) are applied while streaming.
+#   Logs are chronological, so the scan stops at the first record older than `since`.
+# - Pages are linked by an opaque cursor: the fingerprint of the file's first
+#   line plus a byte offset in its uncompressed content. The fingerprint follows
+#   the content through renames and compression on rollover; once the file has
+#   been rotated away entirely the cursor is rejected with CursorExpired.
+# - LOG_QUERY_MAX_SCAN_BYTES bounds the work of one request. A page can come back
+#   short (even empty) with a next_cursor; the client just asks again.
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from app.core.log_config import APP_LOG_PATH, TITLE_LOG_PATH
+
+LOG_READ_BLOCK_SIZE = int(os.getenv("LOG_READ_BLOCK_SIZE", 64 * 1024))
+LOG_QUERY_MAX_SCAN_BYTES = int(os.getenv("LOG_QUERY_MAX_SCAN_BYTES", 64 * 1024 * 1024))
+LOG_QUERY_MAX_LIMIT = 1000
+MAX_BACKUPS = 100  # stop looking for app.log.N after this many
+MAX_FINGERPRINT_LINE = 1024 * 1024
+FROM_END = -1      # cursor offset meaning "the whole file"
+
+_USER_ID = re.compile(rb"user_id\s*[=:]\s*(\d+)", re.IGNORECASE)
+_TEXT_HEADER = re.compile(rb"^\[(?P<ts>[^\]]+)\] (?P<level>[A-Z]+): ")
+
+
+class CursorExpired(ValueError):
+    """The cursor points into a file that has been rotated away."""
+
+
+@dataclass
+class LogRecord:
+    offset: int                    # byte offset of the record in its (uncompressed) file
+    raw: bytes
+    timestamp: Optional[datetime]
+    level: Optional[str]
+    user_id: Optional[int]
+    data: dict = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return self.raw.decode("utf-8", errors="replace")
+
+
+@dataclass
+class LogPage:
+    records: List[LogRecord]       # newest first
+    next_cursor: Optional[str]     # None once the oldest backup has been read
+    scanned_bytes: int
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    # logging's default asctime is "2026-10-18 11:43:36,357" (local time)
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("ascii", errors="replace")
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        except ValueError:
+            return None
+
+
+def _level_number(name: Optional[str]) -> int:
+    number = logging.getLevelName(name.upper()) if name else 0
+    return number if isinstance(number, int) else 0
+
+
+def _user_id_in(raw: bytes) -> Optional[int]:
+    match = _USER_ID.search(raw)
+    return int(match.group(1)) if match else None
+
+
+# -------- Formats --------
+class JsonLinesFormat:
+    """One JSON object per line (python-json-logger)."""
+
+    def is_record_start(self, line: bytes) -> bool:
+        return line.startswith(b"{")
+
+    def parse(self, offset: int, raw: bytes) -> Optional[LogRecord]:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        user_id = data.get("user_id")
+        if user_id is None:
+            user_id = _user_id_in(str(data.get("message", "")).encode("utf-8"))
+        try:
+            user_id = int(user_id) if user_id is not None else None
+        except (TypeError, ValueError):
+            user_id = None
+        return LogRecord(
+            offset=offset,
+            raw=raw,
+            timestamp=_parse_timestamp(data.get("asctime") or data.get("timestamp")),
+            level=data.get("levelname") or data.get("level"),
+            user_id=user_id,
+            data=data,
+        )
+
+
+class TextFormat:
+    """Records formatted as "[asctime] LEVEL: message"; lines without the prefix continue the previous record."""
+
+    def is_record_start(self, line: bytes) -> bool:
+        return _TEXT_HEADER.match(line) is not None
+
+    def parse(self, offset: int, raw: bytes) -> Optional[LogRecord]:
+        match = _TEXT_HEADER.match(raw)
+        if not match:
+            return None
+        level = match.group("level").decode("ascii")
+        message = raw[match.end():].decode("utf-8", errors="replace")
+        asctime = match.group("ts").decode("ascii", errors="replace")
+        return LogRecord(
+            offset=offset,
+            raw=raw,
+            timestamp=_parse_timestamp(asctime),
+            level=level,
+            user_id=_user_id_in(raw),
+            data={"asctime": asctime, "levelname": level, "message": message},
+        )
+
+
+JSON_LINES = JsonLinesFormat()
+TEXT = TextFormat()
+
+
+# -------- Cursors --------
+def encode_cursor(fingerprint: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{fingerprint}:{offset}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        fingerprint, offset = raw.rsplit(":", 1)
+        return fingerprint, int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+# -------- Reading --------
+def _open(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _fingerprint(path: str) -> Optional[str]:
+    """Hash of the first complete line; None while the file has none."""
+    try:
+        with _open(path) as f:
+            first = f.readline(MAX_FINGERPRINT_LINE)
+    except (OSError, EOFError):
+        return None
+    if not first.endswith(b"\n"):
+        return None
+    return hashlib.sha1(first).hexdigest()[:16]
+
+
+def _reverse_lines(f, end: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) pairs from `end` back to the start of a seekable binary file."""
+    pos = end
+    tail = b""
+    while pos > 0:
+        size = min(LOG_READ_BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        buf = f.read(size) + tail
+        lines = buf.split(b"\n")
+        line_end = pos + len(buf)
+        for line in reversed(lines[1:]):
+            start = line_end - len(line)
+            if line:
+                yield start, line
+            line_end = start - 1
+        tail = lines[0]
+    if tail:
+        yield 0, tail
+
+
+class _Scan:
+    """Filters and budget shared by the files of one query."""
+
+    def __init__(self, fmt, min_level, user_id, since, until, limit, max_bytes):
+        self.fmt = fmt
+        self.min_level = min_level
+        self.user_id = user_id
+        self.since = since
+        self.until = until
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.records: List[LogRecord] = []
+        self.scanned = 0
+        self.reached_since = False
+
+    def matches(self, record: LogRecord) -> bool:
+        if self.min_level is not None and _level_number(record.level) < self.min_level:
+            return False
+        if self.user_id is not None and record.user_id != self.user_id:
+            return False
+        if self.until is not None and record.timestamp is not None and record.timestamp > self.until:
+            return False
+        return True
+
+    def is_before_range(self, record: LogRecord) -> bool:
+        return self.since is not None and record.timestamp is not None and record.timestamp < self.since
+
+    @property
+    def full(self) -> bool:
+        return len(self.records) >= self.limit
+
+    @property
+    def over_budget(self) -> bool:
+        return self.scanned >= self.max_bytes
+
+    def scan_plain(self, path: str, end: Optional[int]) -> Optional[int]:
+        """Reads backwards from `end`; returns the offset to resume from, or None when the file is done."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if end is None or end > size:
+                end = size
+                # A line still being written has no newline yet; leave it for the next query
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        end = next(_reverse_lines(f, end))[0]
+            continuation = []
+            for offset, line in _reverse_lines(f, end):
+                self.scanned += len(line) + 1
+                if not self.fmt.is_record_start(line):
+                    continuation.append(line)
+                    continue
+                raw = b"\n".join([line] + continuation[::-1])
+                continuation = []
+                record = self.fmt.parse(offset, raw)
+                if record is None:
+                    continue
+                if self.is_before_range(record):
+                    self.reached_since = True
+                    return None
+                if self.matches(record):
+                    self.records.append(record)
+                if self.full or self.over_budget:
+                    return offset
+        return None
+
+    def scan_gzip(self, path: str, end: Optional[int]) -> Optional[int]:
+        """Streams forward keeping the newest matches before `end`; returns the resume offset or None."""
+        wanted = self.limit - len(self.records)
+        kept = deque(maxlen=wanted)
+        offset = 0
+        current: Optional[Tuple[int, list]] = None
+
+        def finish(entry):
+            record = self.fmt.parse(entry[0], b"\n".join(entry[1]))
+            if record is None:
+                return
+            if self.is_before_range(record):
+                self.reached_since = True
+                kept.clear()  # chronological: everything so far is older than `since`
+                return
+            if self.matches(record):
+                kept.append(record)
+
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if end is not None and offset >= end:
+                    break
+                self.scanned += len(line)
+                stripped = line.rstrip(b"\n")
+                if self.fmt.is_record_start(stripped):
+                    if current is not None:
+                        finish(current)
+                    current = (offset, [stripped])
+                elif current is not None:
+                    current[1].append(stripped)
+                offset += len(line)
+            if current is not None:
+                finish(current)
+
+        self.records.extend(reversed(kept))
+        if self.full and kept:
+            return kept[0].offset
+        return None
+
+
+class LogSource:
+    def __init__(self, path: str, fmt=JSON_LINES):
+        self.path = path
+        self.fmt = fmt
+
+    def files(self) -> List[str]:
+        """Existing files, newest first."""
+        found = [self.path] if os.path.exists(self.path) else []
+        for n in range(1, MAX_BACKUPS + 1):
+            candidates = [f"{self.path}.{n}", f"{self.path}.{n}.gz"]
+            existing = [c for c in candidates if os.path.exists(c)]
+            if not existing:
+                break
+            found.extend(existing)
+        return found
+
+    def _resolve(self, files: List[str], cursor: Optional[str]) -> Tuple[int, Optional[int]]:
+        if not cursor:
+            return 0, None
+        fingerprint, offset = decode_cursor(cursor)
+        for index, path in enumerate(files):
+            if _fingerprint(path) == fingerprint:
+                return index, (None if offset == FROM_END else offset)
+        raise CursorExpired("The log file this cursor points into has been rotated away")
+
+    def query(
+        self,
+        level: Optional[str] = None,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        max_bytes: int = LOG_QUERY_MAX_SCAN_BYTES,
+    ) -> LogPage:
+        """Newest-first page of matching records older than `cursor`."""
+        min_level = None
+        if level:
+            min_level = _level_number(level)
+            if not min_level:
+                raise ValueError(f"Unknown log level: {level!r}")
+        # asctime is local time without an offset
+        if since is not None and since.tzinfo is not None:
+            since = since.astimezone().replace(tzinfo=None)
+        if until is not None and until.tzinfo is not None:
+            until = until.astimezone().replace(tzinfo=None)
+
+        scan = _Scan(self.fmt, min_level, user_id, since, until, max(1, min(limit, LOG_QUERY_MAX_LIMIT)), max_bytes)
+        files = self.files()
+        index, end = self._resolve(files, cursor)
+
+        next_cursor = None
+        for position in range(index, len(files)):
+            path = files[position]
+            start = end if position == index else None
+            if path.endswith(".gz"):
+                resume = scan.scan_gzip(path, start)
+            else:
+                resume = scan.scan_plain(path, start)
+            if resume is not None:
+                fingerprint = _fingerprint(path)
+                if fingerprint:
+                    next_cursor = encode_cursor(fingerprint, resume)
+                break
+            if scan.reached_since:
+                break
+            if scan.full or scan.over_budget:
+                # This file is exhausted; continue with the next one next time
+                if position + 1 < len(files):
+                    fingerprint = _fingerprint(files[position + 1])
+                    if fingerprint:
+                        next_cursor = encode_cursor(fingerprint, FROM_END)
+                break
+        return LogPage(records=scan.records, next_cursor=next_cursor, scanned_bytes=scan.scanned)
+
+
+APP_LOG = LogSource(APP_LOG_PATH, JSON_LINES)
+TITLE_LOG = LogSource(TITLE_LOG_PATH, TEXT)
@@ -0,0 +1,171 @@
+# app/services/message_writer.py
+
+import asyncio
+import logging
+import os
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import AsyncSessionLocal
+from app.models.conversation import ConversationHistory
+from app.services.conversation_service import save_messages, record_inserted_messages
+
+logger = logging.getLogger(__name__)
+
+# "direct":   write through the caller's session (default)
+# "durable":  buffer, but each caller waits until its rows are committed (group commit)
+# "buffered": buffer and return immediately; rows are lost if the process dies before a flush
+MESSAGE_WRITER_MODE = os.getenv("MESSAGE_WRITER_MODE", "direct")
+MESSAGE_WRITER_BATCH_SIZE = int(os.getenv("MESSAGE_WRITER_BATCH_SIZE", 100))
+MESSAGE_WRITER_FLUSH_INTERVAL = float(os.getenv("MESSAGE_WRITER_FLUSH_INTERVAL", 0.5))  # seconds
+MESSAGE_WRITER_MAX_BUFFER = int(os.getenv("MESSAGE_WRITER_MAX_BUFFER", 10_000))
+# Failed flushes of the same batch before it is retried row by row and bad rows are dropped
+MESSAGE_WRITER_MAX_ATTEMPTS = int(os.getenv("MESSAGE_WRITER_MAX_ATTEMPTS", 3))
+
+
+class MessageWriter:
+    """Write-behind buffer that persists ConversationHistory rows in multi-row INSERTs."""
+
+    def __init__(self, mode: str, batch_size: int, flush_interval: float, max_buffer: int):
+        if mode not in ("direct", "durable", "buffered"):
+            raise ValueError(f"Unknown MESSAGE_WRITER_MODE: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._rows = []  # (row, waiter or None)
+        self._pending = {}  # durable waiter -> rows not yet committed
+        self._failures = 0  # consecutive failures of the batch at the head of the buffer
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._stats = {"rows_written": 0, "batches": 0, "failed_batches": 0, "rows_dropped": 0}
+
+    @property
+    def buffering(self) -> bool:
+        return self.mode != "direct" and self._task is not None
+
+    def start(self):
+        if self.mode != "direct" and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        # Stop the background loop, then drain whatever is still buffered
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(final=True)
+
+    async def write(self, db: AsyncSession, rows: list, commit: bool = True):
+        # With commit=False a direct write joins the caller's open transaction
+        if not self.buffering:
+            await save_messages(db, rows, commit)
+            self._stats["rows_written"] += len(rows)
+            self._stats["batches"] += 1
+            return
+
+        if len(self._rows) + len(rows) > self.max_buffer:
+            # Buffer is saturated (DB down or too slow); fall back to a direct write
+            await save_messages(db, rows, commit)
+            self._stats["rows_written"] += len(rows)
+            self._stats["batches"] += 1
+            return
+
+        waiter = None
+        if self.mode == "durable":
+            waiter = asyncio.get_running_loop().create_future()
+            self._pending[waiter] = len(rows)
+        self._rows.extend((row, waiter) for row in rows)
+        if len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+        if waiter is not None:
+            await waiter
+
+    async def _insert(self, rows: list):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ConversationHistory).values(rows))
+            await record_inserted_messages(db, rows)
+            await db.commit()
+
+    def _written(self, entries: list):
+        # A durable caller is released once the last of its rows is committed
+        for _, waiter in entries:
+            if waiter is None or waiter not in self._pending:
+                continue
+            self._pending[waiter] -= 1
+            if self._pending[waiter] == 0:
+                del self._pending[waiter]
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def _dropped(self, entry, error: Exception):
+        _, waiter = entry
+        if waiter is not None and self._pending.pop(waiter, None) is not None and not waiter.done():
+            waiter.set_exception(error)
+
+    async def _isolate(self, batch: list):
+        """Writes a batch that keeps failing row by row; rows that still fail are dropped."""
+        written = []
+        for entry in batch:
+            try:
+                await self._insert([entry[0]])
+            except Exception as e:
+                logger.error("Dropping buffered message (chat_session_id=%s): %s", entry[0].get("chat_session_id"), e)
+                self._stats["rows_dropped"] += 1
+                self._dropped(entry, e)
+                continue
+            written.append(entry)
+        self._stats["rows_written"] += len(written)
+        self._written(written)
+
+    async def flush(self, final: bool = False):
+        # final=True (shutdown) isolates a failing batch right away instead of retrying later
+        async with self._flush_lock:
+            while self._rows:
+                batch = self._rows[:self.batch_size]
+                try:
+                    await self._insert([row for row, _ in batch])
+                except Exception as e:
+                    self._stats["failed_batches"] += 1
+                    self._failures += 1
+                    logger.error("Message flush of %d rows failed (attempt %d): %s", len(batch), self._failures, e)
+                    if not final and self._failures < MESSAGE_WRITER_MAX_ATTEMPTS:
+                        return
+                    # The batch itself is the problem (e.g. a row whose session was deleted):
+                    # don't let it hold up everything queued behind it
+                    await self._isolate(batch)
+                else:
+                    self._stats["rows_written"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._written(batch)
+                self._failures = 0
+                del self._rows[:len(batch)]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "buffered_rows": len(self._rows),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            **self._stats,
+        }
+
+
+message_writer = MessageWriter(
+    MESSAGE_WRITER_MODE,
+    MESSAGE_WRITER_BATCH_SIZE,
+    MESSAGE_WRITER_FLUSH_INTERVAL,
+    MESSAGE_WRITER_MAX_BUFFER,
+)
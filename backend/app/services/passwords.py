@@ -0,0 +1,148 @@
+# app/services/passwords.py
+#
+# bcrypt is slow on purpose, so async code never runs it on the event loop:
+# hashing and verification go through a small thread pool. At most
+# PASSWORD_HASH_MAX_PENDING calls are handed to the pool at once; the rest
+# wait for a slot, so a burst of logins doesn't stall chat traffic.
+# The cost factor comes from BCRYPT_ROUNDS; hashes with another cost are
+# re-hashed on the next successful login.
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+# min/max pinned to the configured cost, so needs_update() flags any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+# -------- Sync API (scripts, worker threads) --------
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# -------- Worker pool --------
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._queued = 0  # submitted, not yet picked up by a worker
+        self._running = 0
+        self._waiting = 0  # waiting for a slot
+        self._max_queued = 0
+        self._completed = 0
+        self._rehashed = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    def _run(self, submitted_at: float, fn, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_total += started - submitted_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._run_total += time.perf_counter() - started
+
+    async def _submit(self, fn, *args):
+        self._ensure_started()
+        with self._lock:
+            self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        try:
+            with self._lock:
+                self._queued += 1
+                self._max_queued = max(self._max_queued, self._queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run, time.perf_counter(), fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(pwd_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        # (valid, new_hash); new_hash is set when the stored hash uses another cost
+        valid, new_hash = await self._submit(pwd_context.verify_and_update, plain_password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self._rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._queued,
+                "waiting_for_slot": self._waiting,
+                "max_queued": self._max_queued,
+                "completed": completed,
+                "rehashed_on_login": self._rehashed,
+                "avg_queue_wait_ms": round(self._wait_total / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self._run_total / completed * 1000, 2) if completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+# -------- Async API (request handlers) --------
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
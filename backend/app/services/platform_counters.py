@@ -0,0 +1,179 @@
+# app/services/platform_counters.py
+#
+# Platform totals (users, chat_sessions, messages) kept in platform_counters so
+# /admin/analytics/basic-stats never has to COUNT(*) the big tables.
+#
+# - ORM writes are counted automatically: an after_flush hook turns the new and
+#   deleted User / ChatSession / ConversationHistory objects of each flush into
+#   one upsert inside the same transaction.
+# - Bulk Core statements (insert(...).values(rows), delete(...)) bypass the ORM
+#   and must call increment_counters() with the rows they touched.
+# - Positive deltas also go to today's bucket, which gives the daily rollups
+#   ("created per day"); deletions only adjust the lifetime totals.
+# - A periodic reconciliation recounts the lifetime totals and fixes any drift.
+
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+from app.db.database import AsyncSessionLocal
+from app.db.upsert import upsert_add
+from app.models.counter import PlatformCounter
+from app.models.conversation import ChatSession, ConversationHistory
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+COUNTER_SLOTS = int(os.getenv("PLATFORM_COUNTER_SLOTS", 8))
+COUNTER_RECONCILE_INTERVAL = float(os.getenv("PLATFORM_COUNTER_RECONCILE_INTERVAL", 3600))  # seconds, 0 disables
+_RECONCILE_LOCK_ID = 7317001  # pg advisory lock, one reconciler across workers
+
+ALL = "all"
+COUNTED_MODELS = {
+    User: "users",
+    ChatSession: "chat_sessions",
+    ConversationHistory: "messages",
+}
+
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+def _upsert_rows(dialect_name: str, rows: list):
+    return upsert_add(dialect_name, PlatformCounter, rows, ["name", "bucket", "slot"], "value")
+
+
+def counter_upsert(dialect_name: str, deltas: dict):
+    """Upsert adding `deltas` ({name: n}) to the lifetime and today's counters."""
+    slot = random.randrange(COUNTER_SLOTS)
+    today = _today()
+    rows = []
+    for name, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        rows.append({"name": name, "bucket": ALL, "slot": slot, "value": delta})
+        if delta > 0:
+            rows.append({"name": name, "bucket": today, "slot": slot, "value": delta})
+    if not rows:
+        return None
+    return _upsert_rows(dialect_name, rows)
+
+
+async def increment_counters(db, deltas: dict):
+    """Adds deltas within the caller's transaction (for Core bulk statements)."""
+    stmt = counter_upsert(db.get_bind().dialect.name, deltas)
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _count_orm_writes(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        name = COUNTED_MODELS.get(type(obj))
+        if name:
+            deltas[name] = deltas.get(name, 0) + 1
+    for obj in session.deleted:
+        name = COUNTED_MODELS.get(type(obj))
+        if name:
+            deltas[name] = deltas.get(name, 0) - 1
+    if deltas:
+        stmt = counter_upsert(session.get_bind().dialect.name, deltas)
+        if stmt is not None:
+            session.connection().execute(stmt)
+
+
+# -------- Reads --------
+async def get_totals(db) -> dict:
+    result = await db.execute(
+        select(PlatformCounter.name, func.sum(PlatformCounter.value))
+        .where(PlatformCounter.bucket == ALL)
+        .group_by(PlatformCounter.name)
+    )
+    totals = {name: 0 for name in COUNTED_MODELS.values()}
+    totals.update({name: int(value or 0) for name, value in result.all()})
+    return totals
+
+
+async def get_daily_rollups(db, days: int) -> list:
+    """[{"date": "2026-10-18", "users": 3, "chat_sessions": 10, "messages": 250}, ...], oldest first."""
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    result = await db.execute(
+        select(PlatformCounter.bucket, PlatformCounter.name, func.sum(PlatformCounter.value))
+        .where(PlatformCounter.bucket.between(start.isoformat(), end.isoformat()))
+        .group_by(PlatformCounter.bucket, PlatformCounter.name)
+    )
+    by_day = {}
+    for bucket, name, value in result.all():
+        by_day.setdefault(bucket, {})[name] = int(value or 0)
+    rollups = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        counts = by_day.get(day, {})
+        rollups.append({"date": day, **{name: counts.get(name, 0) for name in COUNTED_MODELS.values()}})
+    return rollups
+
+
+# -------- Reconciliation --------
+async def reconcile_counters() -> dict:
+    """Recounts the lifetime totals and writes the difference into slot 0.
+
+    Returns the corrections applied ({} if another worker holds the lock)."""
+    async with AsyncSessionLocal() as db:
+        dialect_name = db.get_bind().dialect.name
+        if dialect_name == "postgresql":
+            # One snapshot for the totals and the COUNT(*)s, so a write committing between
+            # them isn't mistaken for drift (a concurrent update of slot 0 aborts the round)
+            await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            locked = (await db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _RECONCILE_LOCK_ID})).scalar()
+            if not locked:
+                return {}
+        current = await get_totals(db)
+        corrections = {}
+        for model, name in COUNTED_MODELS.items():
+            actual = (await db.execute(select(func.count()).select_from(model))).scalar()
+            if actual != current[name]:
+                corrections[name] = actual - current[name]
+        if corrections:
+            # Lifetime totals only; daily buckets record what happened that day
+            await db.execute(_upsert_rows(dialect_name, [
+                {"name": name, "bucket": ALL, "slot": 0, "value": delta}
+                for name, delta in corrections.items()
+            ]))
+            logger.warning("Platform counters drifted, corrected by %s", corrections)
+        await db.commit()
+    return corrections
+
+
+_reconciler = None
+
+
+async def _reconcile_loop():
+    while True:
+        await asyncio.sleep(COUNTER_RECONCILE_INTERVAL)
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            logger.warning("Platform counter reconciliation failed: %s", e)
+
+
+def start_counter_reconciler():
+    global _reconciler
+    if COUNTER_RECONCILE_INTERVAL > 0 and _reconciler is None:
+        _reconciler = asyncio.create_task(_reconcile_loop())
+
+
+async def stop_counter_reconciler():
+    global _reconciler
+    if _reconciler is not None:
+        _reconciler.cancel()
+        try:
+            await _reconciler
+        except asyncio.CancelledError:
+            pass
+        _reconciler = None
@@ -0,0 +1,204 @@
+# app/services/principal.py
+#
+# Single place where a bearer token is resolved to the calling user.
+# Verified tokens map to lightweight, immutable user snapshots held in a
+# bounded TTL cache, so read-only routes don't need a DB round trip.
+# Anything that changes a user's profile, password, ban or admin flag must
+# call principal_cache.invalidate_user(user_id). Accounts pending deletion
+# (users.deleted_at set) no longer authenticate.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import AsyncSessionLocal
+from app.db.dependencies import get_db, get_async_db
+from app.models.user import User
+from app.services.auth import decode_access_token, oauth2_scheme
+
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))  # seconds
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10_000))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot of the authenticated user (the fields exposed by UserOut)."""
+    id: int
+    username: str
+    email: str
+    display_name: Optional[str]
+    avatar_url: Optional[str]
+    bio: Optional[str]
+    preferred_language: Optional[str]
+    language_level: Optional[str]
+    current_level: Optional[str]
+    experience_points: int
+    total_sessions: int
+    total_messages: int
+    last_login: Optional[datetime]
+    interface_language: Optional[str]
+    timezone: Optional[str]
+    is_admin: bool
+    is_banned: bool
+    row_version: int  # ETag source for /users/me, not part of the payload
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            display_name=user.display_name,
+            avatar_url=user.avatar_url,
+            bio=user.bio,
+            preferred_language=user.preferred_language,
+            language_level=user.language_level,
+            current_level=user.current_level,
+            experience_points=user.experience_points or 0,
+            total_sessions=user.total_sessions or 0,
+            total_messages=user.total_messages or 0,
+            last_login=user.last_login,
+            interface_language=user.interface_language,
+            timezone=user.timezone,
+            is_admin=bool(user.is_admin),
+            is_banned=bool(user.is_banned),
+            row_version=user.row_version or 0,
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["row_version"]
+        return data
+
+
+class PrincipalCache:
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()  # sync routes resolve users from the threadpool
+        self._entries = OrderedDict()  # token -> (expires_at, principal)
+        self._tokens_by_user = {}  # user_id -> {token, ...}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self._remove(token)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, token: str, principal: Principal, token_expires_at: float = None):
+        # Never outlive the token itself
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "users": len(self._tokens_by_user),
+                "ttl": self.ttl,
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                **self._stats,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_token(token: str):
+    """Return (user_id, token expiry timestamp) for a valid token or raise 401."""
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    try:
+        return int(payload["sub"]), payload.get("exp")
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+
+
+# -------- Dependencies --------
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    # Read-only routes: served from the cache, no DB session is opened on a hit
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    user_id, expires_at = verify_token(token)
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
+    if user is None or user.deleted_at is not None:
+        raise _credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, expires_at)
+    return principal
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    # Routes that modify the user need the ORM row in their own session
+    principal = principal_cache.get(token)
+    user_id = principal.id if principal is not None else verify_token(token)[0]
+    user = await db.get(User, user_id)
+    if user is None or user.deleted_at is not None:
+        raise _credentials_exception()
+    return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    principal = principal_cache.get(token)
+    user_id = principal.id if principal is not None else verify_token(token)[0]
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None or user.deleted_at is not None:
+        raise _credentials_exception()
+    return user
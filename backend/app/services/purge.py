@@ -0,0 +1,178 @@
+# app/services/purge.py
+#
+# Deleting a chat session or an account happens in two steps:
+#   1. request_session_deletion() / request_user_deletion() set deleted_at and
+#      enqueue a purge job in one short transaction. From then on, reads treat
+#      the row as gone, and the API answers without waiting for the delete.
+#   2. The job removes the rows with set-based DELETE ... WHERE id IN (SELECT ...
+#      LIMIT PURGE_BATCH_SIZE) statements, one transaction per batch. Nothing is
+#      loaded through the ORM, and no transaction holds more than one batch of
+#      locks. After PURGE_MAX_BATCHES_PER_JOB batches the job re-enqueues
+#      itself, so one huge account doesn't monopolise a job worker.
+# These are Core deletes, so the ORM after_flush hooks don't see them. Each batch
+# adjusts the platform counters and the messages leaderboard in its own
+# transaction instead. A purge that dies part-way is retried by the job queue
+# and carries on from where it stopped.
+#
+# The schema declares ON DELETE CASCADE from users and chat_sessions, so deleting
+# a parent row directly is safe too. The jobs still delete the children explicitly,
+# for two reasons: a cascade over a large account would be one huge
+# statement, and SQLite enforces cascades only with PRAGMA foreign_keys=ON.
+
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, select, update
+from app.db.database import AsyncSessionLocal
+from app.models.badge import UserBadge
+from app.models.conversation import ChatSession, ConversationHistory
+from app.models.leaderboard import LeaderboardScore
+from app.models.user import User, bump_sessions_version
+from app.models.xp_ledger import XpLedgerEntry
+from app.services.badges import awarded_cache
+from app.services.job_queue import enqueue_job, notify_job_workers, register_job_handler
+from app.services.leaderboard import LEADERBOARD_REFRESH_INTERVAL, record_message_deletions
+from app.services.platform_counters import increment_counters
+from app.services.principal import principal_cache
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 1000))
+PURGE_MAX_BATCHES_PER_JOB = int(os.getenv("PURGE_MAX_BATCHES_PER_JOB", 50))
+# Zeroed leaderboard rows must outlive one refresh so every worker drops the user
+USER_PURGE_DELAY = float(os.getenv("USER_PURGE_DELAY", max(60.0, 3 * LEADERBOARD_REFRESH_INTERVAL)))  # seconds
+
+SESSION_PURGE_JOB = "purge_chat_session"
+USER_PURGE_JOB = "purge_user"
+
+
+async def _delete_batch(db, model, *criteria) -> int:
+    ids = select(model.id).where(*criteria).limit(PURGE_BATCH_SIZE)
+    result = await db.execute(delete(model).where(model.id.in_(ids)))
+    return result.rowcount
+
+
+async def _delete_message_batch(db, *criteria) -> list:
+    # (user_id, timestamp) of the deleted rows, so the leaderboard windows they counted in are adjusted
+    ids = select(ConversationHistory.id).where(*criteria).limit(PURGE_BATCH_SIZE)
+    result = await db.execute(
+        delete(ConversationHistory)
+        .where(ConversationHistory.id.in_(ids))
+        .returning(ConversationHistory.user_id, ConversationHistory.timestamp)
+    )
+    return result.all()
+
+
+# -------- Requests --------
+async def request_session_deletion(db, chat_session_id: int, user_id: Optional[int] = None) -> Optional[int]:
+    """
+    Hides the session and queues its purge. Returns the owner's id, or None if
+    there is no such session (or it is already pending deletion).
+    """
+    query = update(ChatSession).where(ChatSession.id == chat_session_id, ChatSession.deleted_at.is_(None))
+    if user_id is not None:
+        query = query.where(ChatSession.user_id == user_id)
+    owner_id = (await db.execute(query.values(deleted_at=datetime.utcnow()).returning(ChatSession.user_id))).scalar()
+    if owner_id is None:
+        await db.rollback()
+        return None
+    await db.execute(bump_sessions_version(owner_id))
+    await enqueue_job(db, SESSION_PURGE_JOB, {"chat_session_id": chat_session_id})
+    await db.commit()
+    notify_job_workers()
+    return owner_id
+
+
+async def request_user_deletion(db, user_id: int) -> bool:
+    """Locks the account out, takes it off the leaderboards and queues its purge. False if already requested."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+        .values(deleted_at=now, row_version=User.row_version + 1)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return False
+    await db.execute(
+        update(LeaderboardScore).where(LeaderboardScore.user_id == user_id).values(score=0, updated_at=now)
+    )
+    await enqueue_job(db, USER_PURGE_JOB, {"user_id": user_id}, delay=USER_PURGE_DELAY)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
+    return True
+
+
+# -------- Purge jobs --------
+async def purge_chat_session(chat_session_id: int) -> bool:
+    """Runs up to PURGE_MAX_BATCHES_PER_JOB batches; True once the session is gone."""
+    for _ in range(PURGE_MAX_BATCHES_PER_JOB):
+        async with AsyncSessionLocal() as db:
+            deleted = await _delete_message_batch(db, ConversationHistory.chat_session_id == chat_session_id)
+            if deleted:
+                await increment_counters(db, {"messages": -len(deleted)})
+                await record_message_deletions(db, deleted)
+            if len(deleted) < PURGE_BATCH_SIZE:
+                # Last batch: the session row goes in the same transaction
+                removed = (await db.execute(delete(ChatSession).where(ChatSession.id == chat_session_id))).rowcount
+                if removed:
+                    await increment_counters(db, {"chat_sessions": -removed})
+                await db.commit()
+                return True
+            await db.commit()
+    return False
+
+
+# Large per-user tables, emptied batch by batch before the user row: (model, counter name)
+_USER_TABLES = (
+    (ConversationHistory, "messages"),
+    (ChatSession, "chat_sessions"),
+    (XpLedgerEntry, None),
+)
+
+
+async def purge_user(user_id: int) -> bool:
+    """Runs up to PURGE_MAX_BATCHES_PER_JOB batches; True once the account is gone."""
+    for _ in range(PURGE_MAX_BATCHES_PER_JOB):
+        async with AsyncSessionLocal() as db:
+            deleted = 0
+            for model, counter in _USER_TABLES:
+                deleted = await _delete_batch(db, model, model.user_id == user_id)
+                if deleted:
+                    if counter:
+                        await increment_counters(db, {counter: -deleted})
+                    break
+            if not deleted:
+                # Small tables, then the user row itself
+                await db.execute(delete(UserBadge).where(UserBadge.user_id == user_id))
+                await db.execute(delete(LeaderboardScore).where(LeaderboardScore.user_id == user_id))
+                removed = (await db.execute(delete(User).where(User.id == user_id))).rowcount
+                if removed:
+                    await increment_counters(db, {"users": -removed})
+                await db.commit()
+                awarded_cache.invalidate(user_id)
+                return True
+            await db.commit()
+    return False
+
+
+async def _continue_later(kind: str, payload: dict):
+    async with AsyncSessionLocal() as db:
+        await enqueue_job(db, kind, payload)
+        await db.commit()
+    notify_job_workers()
+
+
+@register_job_handler(SESSION_PURGE_JOB)
+async def run_session_purge(payload: dict):
+    if not await purge_chat_session(payload["chat_session_id"]):
+        await _continue_later(SESSION_PURGE_JOB, payload)
+
+
+@register_job_handler(USER_PURGE_JOB)
+async def run_user_purge(payload: dict):
+    if await purge_user(payload["user_id"]):
+        logger.info("Purged user_id=%s", payload["user_id"])
+    else:
+        await _continue_later(USER_PURGE_JOB, payload)
@@ -0,0 +1,174 @@
+# app/services/response_cache.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 24 * 3600))  # seconds
+# Optional tier shared by every worker on the host, e.g. "cache/responses.sqlite3"
+RESPONSE_CACHE_SQLITE_PATH = os.getenv("RESPONSE_CACHE_SQLITE_PATH")
+
+
+def normalize_message(message: str) -> str:
+    # "What is the past tense of GO?" and "what is the past tense of go" share a key
+    text = unicodedata.normalize("NFKC", message).casefold()
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text)
+    return " ".join(text.split())
+
+
+class LRUTTLCache:
+    """In-process LRU map whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheTier:
+    """Cache table in a local SQLite file, shared between worker processes."""
+
+    def __init__(self, path: str, ttl: int):
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, keys: tuple, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key in keys],
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of chatbot replies to context-free prompts. Lookups try the
+    exact message first and then its normalized form, in memory and then in
+    the optional shared SQLite tier.
+    """
+
+    def __init__(self, enabled: bool, max_entries: int, ttl: int, sqlite_path: str = None):
+        self.enabled = enabled
+        self.memory = LRUTTLCache(max_entries, ttl)
+        self.shared = None
+        if enabled and sqlite_path:
+            try:
+                self.shared = SQLiteCacheTier(sqlite_path, ttl)
+            except sqlite3.Error as e:
+                logger.warning("Shared response cache disabled: %s", e)
+        self._stats = {"exact_hits": 0, "normalized_hits": 0, "shared_hits": 0, "misses": 0, "bypassed": 0}
+
+    @staticmethod
+    def keys(language: str, system_prompt: str, message: str) -> tuple:
+        prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+        exact = hashlib.sha256(f"{language}\0{prompt_hash}\0{message.strip()}".encode()).hexdigest()
+        normalized = hashlib.sha256(f"{language}\0{prompt_hash}\0n:{normalize_message(message)}".encode()).hexdigest()
+        return exact, normalized
+
+    def record_bypass(self):
+        self._stats["bypassed"] += 1
+
+    async def get(self, language: str, system_prompt: str, message: str):
+        if not self.enabled:
+            return None
+        exact, normalized = self.keys(language, system_prompt, message)
+
+        value = self.memory.get(exact)
+        if value is not None:
+            self._stats["exact_hits"] += 1
+            return value
+        value = self.memory.get(normalized)
+        if value is not None:
+            self._stats["normalized_hits"] += 1
+            return value
+
+        if self.shared is not None:
+            for key in (exact, normalized):
+                value = await asyncio.to_thread(self.shared.get, key)
+                if value is not None:
+                    self._stats["shared_hits"] += 1
+                    self.memory.set(exact, value)
+                    return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, language: str, system_prompt: str, message: str, response: str):
+        if not self.enabled:
+            return
+        keys = self.keys(language, system_prompt, message)
+        for key in keys:
+            self.memory.set(key, response)
+        if self.shared is not None:
+            try:
+                await asyncio.to_thread(self.shared.set, keys, response)
+            except sqlite3.Error as e:
+                logger.warning("Shared response cache write failed: %s", e)
+
+    def stats(self) -> dict:
+        hits = self._stats["exact_hits"] + self._stats["normalized_hits"] + self._stats["shared_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "shared_tier": self.shared is not None,
+            "entries": len(self.memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            **self._stats,
+        }
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_SQLITE_PATH,
+)
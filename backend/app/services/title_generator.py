@@ -1,15 +1,11 @@
 import logging
-import os
-from logging.handlers import RotatingFileHandler
-import gzip
-import shutil
 
-from app.services.chatbot_service import get_chatbot_response
-
-# Create logs directory if it doesn't exist
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-LOG_PATH = os.path.join(LOG_DIR, "title_generation.log")
+from sqlalchemy import update
+from app.db.database import AsyncSessionLocal
+from app.models.conversation import ChatSession
+from app.models.user import bump_sessions_version
+from app.services.chatbot_service import get_completion
+from app.services.job_queue import register_job_handler
 
 # Supported languages list (you can expand this as needed)
 SUPPORTED_LANGUAGES = {
@@ -18,31 +14,8 @@ SUPPORTED_LANGUAGES = {
     "Polish", "Dutch", "Ukrainian", "Hindi"
 }
 
-# Custom RotatingFileHandler with gzip compression
-class GZipRotatingFileHandler(RotatingFileHandler):
-    def doRollover(self):
-        super().doRollover()
-        if self.backupCount > 0:
-            log_filename = f"{self.baseFilename}.1"
-            gz_filename = f"{log_filename}.gz"
-            if os.path.exists(log_filename):
-                with open(log_filename, 'rb') as f_in, gzip.open(gz_filename, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-                os.remove(log_filename)
-
-# Setup logger
+# Written to logs/title_generation.log by the queued logging setup (app/core/log_config.py)
 logger = logging.getLogger("title_generator")
-logger.setLevel(logging.INFO)
-
-if not logger.handlers:
-    handler = GZipRotatingFileHandler(
-        LOG_PATH,
-        maxBytes=100_000,
-        backupCount=5
-    )
-    formatter = logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
 
 # --- Title Generation Function with Fallback ---
@@ -61,7 +34,7 @@ async def generate_title_from_message(message: str, user_id: int, language: str
     )
 
     try:
-        title = await get_chatbot_response(prompt, user_id, preferred_language=language)
+        title = await get_completion([{"role": "user", "content": prompt}], max_tokens=30)
         clean_title = title.strip().replace('"', '')
 
         logger.info(
@@ -75,3 +48,24 @@ async def generate_title_from_message(message: str, user_id: int, language: str
     except Exception as e:
         logger.error(f"Title generation failed for user_id={user_id}: {str(e)}")
         raise
+
+
+# --- Background job: title a chat session from its first message ---
+TITLE_JOB = "generate_session_title"
+
+
+async def _set_session_title(chat_session_id: int, user_id: int, values: dict):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(ChatSession).where(ChatSession.id == chat_session_id).values(**values))
+        await db.execute(bump_sessions_version(user_id))
+        await db.commit()
+
+
+async def _title_job_failed(payload: dict, error: Exception):
+    await _set_session_title(payload["chat_session_id"], payload["user_id"], {"title_status": "failed"})
+
+
+@register_job_handler(TITLE_JOB, on_failure=_title_job_failed)
+async def run_title_job(payload: dict):
+    title = await generate_title_from_message(payload["message"], payload["user_id"], payload["language"])
+    await _set_session_title(payload["chat_session_id"], payload["user_id"], {"title": title, "title_status": "ready"})
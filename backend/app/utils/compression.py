@@ -0,0 +1,165 @@
+# app/utils/compression.py
+#
+# Response compression negotiated from Accept-Encoding: brotli when the
+# optional `brotli` package is installed and the client accepts it, else gzip.
+# Small bodies (< COMPRESSION_MIN_SIZE), already-encoded responses, and
+# incremental streams (SSE / NDJSON chat tokens, which must not be buffered)
+# pass through untouched. Streamed bodies of compressible types, such as
+# static JS/CSS, are compressed chunk by chunk.
+
+import gzip
+import os
+import zlib
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))  # fast enough for dynamic bodies
+# Bodies above this size are compressed in a worker thread instead of on the event loop
+COMPRESSION_THREAD_THRESHOLD = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", 256 * 1024))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+SUPPORTED_CODINGS = (("br",) if brotli is not None else ()) + ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, supported=SUPPORTED_CODINGS):
+    """Best of `supported` (in preference order) accepted by an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    for coding in supported:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def _compressor(coding: str):
+    if coding == "br":
+        return brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+    # wbits 16+ produces a gzip container
+    return zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    def __init__(self, coding: str):
+        self.coding = coding
+        self._obj = _compressor(coding)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.finish() if self.coding == "br" else self._obj.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        streamer = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, streamer, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith(STREAMING_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Hold the start message until the body size is known
+                start_message = dict(message, headers=list(message.get("headers", [])))
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"]) if start_message else None
+
+            if streamer is None and not more_body:
+                # Whole body in one message (the normal case for JSON)
+                headers.add_vary_header("Accept-Encoding")
+                if len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send(message)
+                    return
+                if len(body) > COMPRESSION_THREAD_THRESHOLD:
+                    body = await anyio.to_thread.run_sync(compress, body, coding)
+                else:
+                    body = compress(body, coding)
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            if streamer is None:
+                # First chunk of a streamed body
+                streamer = _StreamCompressor(coding)
+                headers.add_vary_header("Accept-Encoding")
+                headers["Content-Encoding"] = coding
+                del headers["Content-Length"]
+                await send(start_message)
+
+            data = streamer.chunk(body)
+            if not more_body:
+                data += streamer.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
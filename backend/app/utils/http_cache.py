@@ -0,0 +1,79 @@
+# app/utils/http_cache.py
+#
+# Conditional GET for read-mostly endpoints. Routes build a strong ETag from
+# version counters they can read cheaply (lesson catalog digest, users.row_version,
+# users.sessions_version), then call conditional_response() before building
+# the body. On a matching If-None-Match the route returns the 304 as-is, so
+# the payload is never loaded or serialized:
+#
+#     etag = make_etag("me", principal.id, principal.row_version)
+#     not_modified = conditional_response(request, response, etag, PRIVATE_REVALIDATE)
+#     if not_modified:
+#         return not_modified
+#     return build_payload()
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Cache-Control policies used by the routes
+PRIVATE_REVALIDATE = "private, no-cache"        # per-user data: always revalidate (cheap 304)
+PRIVATE_SHORT = "private, max-age=60"           # shared catalog data behind auth
+PRIVATE_LONG = "private, max-age=3600"          # effectively static content
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from version counters, e.g. make_etag("sessions", user_id, version)."""
+    raw = ":".join(str(part) for part in parts)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = PRIVATE_REVALIDATE,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Return a 304 Response when the client's copy is current. Otherwise set
+    ETag / Last-Modified / Cache-Control on `response` and return None.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        fresh = _not_modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
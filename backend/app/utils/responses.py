@@ -0,0 +1,23 @@
+# app/utils/responses.py
+#
+# App-wide JSON response class (FastAPI(default_response_class=...)).
+# Route return values are still converted by FastAPI first (Pydantic for a
+# response_model, jsonable_encoder otherwise); hot read endpoints build plain
+# dicts and return FastJSONResponse(content) themselves, which skips that step.
+
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (handles datetime natively)."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
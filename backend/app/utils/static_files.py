@@ -0,0 +1,195 @@
+# app/utils/static_files.py
+#
+# StaticFiles variants with explicit caching policies.
+#
+# PrecompressedStaticFiles serves the frontend build and /static:
+# - Compressible files get .br / .gz siblings. Siblings already in the
+#   directory (e.g. from the build) are used as they are. Missing or stale ones are
+#   built once by prepare(), which runs in a thread at startup, and written next to
+#   the file or into STATIC_PRECOMPRESS_CACHE_DIR if the directory is read-only.
+#   Requests then pick a variant from Accept-Encoding with no compression work and
+#   no extra stat() calls. Until prepare() finishes, CompressionMiddleware
+#   compresses on the fly as before.
+# - Cache-Control: content-hashed build assets (assets/index-B4x9_kLq.js) are
+#   immutable, HTML is always revalidated, everything else is cached for an hour.
+# - SPA fallback: unknown paths without a file extension get index.html, so
+#   client-side routes survive a reload. /api paths are never rewritten.
+# - Bodies go out through FileResponse, which uses the ASGI pathsend extension
+#   (the server sends the file itself) when the server offers it.
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from mimetypes import guess_type
+from typing import Dict, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from app.utils.compression import brotli, choose_encoding, COMPRESSION_MIN_SIZE
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT = "public, max-age=3600"
+
+STATIC_PRECOMPRESS_CACHE_DIR = os.getenv(
+    "STATIC_PRECOMPRESS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "chatbot_static_precompressed")
+)
+PRECOMPRESSIBLE_EXTENSIONS = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".wasm"}
+_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+# Vite names build output <name>-<8+ char base64url hash>.<ext>
+_HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """For content-addressed files (the name changes whenever the content does)."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+def _compress(coding: str, data: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(
+        self,
+        *,
+        directory: str,
+        html: bool = False,
+        spa_fallback: Optional[str] = None,
+        immutable_prefixes: Tuple[str, ...] = ("assets/",),
+        fallback_exclude: Tuple[str, ...] = ("api/",),
+        **kwargs,
+    ):
+        super().__init__(directory=directory, html=html, **kwargs)
+        self.spa_fallback = spa_fallback
+        self.immutable_prefixes = immutable_prefixes
+        self.fallback_exclude = fallback_exclude
+        # realpath of the original -> {coding: (variant path, variant stat)}
+        self._variants: Dict[str, Dict[str, tuple]] = {}
+        self._root = os.path.realpath(directory)
+        self._cache_dir = os.path.join(
+            STATIC_PRECOMPRESS_CACHE_DIR, hashlib.sha1(self._root.encode("utf-8")).hexdigest()[:12]
+        )
+        self.prepared = False
+
+    # -------- Startup --------
+    def _variant_for(self, full_path: str, relative: str, coding: str, source_stat) -> Optional[tuple]:
+        sibling = full_path + _EXTENSIONS[coding]
+        cached = os.path.join(self._cache_dir, relative + _EXTENSIONS[coding])
+        for candidate in (sibling, cached):
+            try:
+                candidate_stat = os.stat(candidate)
+            except OSError:
+                continue
+            if candidate_stat.st_mtime >= source_stat.st_mtime:
+                return candidate, candidate_stat
+        if coding == "br" and brotli is None:
+            return None
+        with open(full_path, "rb") as f:
+            data = _compress(coding, f.read())
+        if len(data) >= source_stat.st_size:
+            return None
+        try:
+            _write_atomic(sibling, data)
+            target = sibling
+        except OSError:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            _write_atomic(cached, data)
+            target = cached
+        return target, os.stat(target)
+
+    def prepare(self) -> dict:
+        """Finds or builds the .br / .gz variants of every compressible file (blocking; run in a thread)."""
+        variants = {}
+        for root, _, files in os.walk(self._root):
+            for name in files:
+                extension = os.path.splitext(name)[1].lower()
+                if extension not in PRECOMPRESSIBLE_EXTENSIONS:
+                    continue
+                full_path = os.path.join(root, name)
+                source_stat = os.stat(full_path)
+                if source_stat.st_size < COMPRESSION_MIN_SIZE:
+                    continue
+                relative = os.path.relpath(full_path, self._root)
+                for coding in _EXTENSIONS:
+                    try:
+                        variant = self._variant_for(full_path, relative, coding, source_stat)
+                    except OSError as e:
+                        logger.warning("Could not precompress %s (%s): %s", relative, coding, e)
+                        continue
+                    if variant is not None:
+                        variants.setdefault(full_path, {})[coding] = variant
+        self._variants = variants
+        self.prepared = True
+        return {"directory": str(self.directory), "files": len(variants), "variants": sum(len(v) for v in variants.values())}
+
+    # -------- Requests --------
+    def cache_control(self, relative_path: str) -> str:
+        relative_path = relative_path.replace(os.sep, "/")
+        if relative_path.endswith(".html"):
+            return REVALIDATE
+        if relative_path.startswith(self.immutable_prefixes) and _HASHED_NAME.search(relative_path):
+            return IMMUTABLE
+        return SHORT
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        # lookup_path() already resolved full_path to a real path under the directory
+        full_path = str(full_path)
+        variants = self._variants.get(full_path)
+        media_type = guess_type(full_path)[0] or "text/plain"
+        coding = None
+        if variants:
+            coding = choose_encoding(request_headers.get("accept-encoding", ""), supported=tuple(variants))
+        if coding:
+            path, variant_stat = variants[coding]
+            response = FileResponse(path, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+            response.headers["Content-Encoding"] = coding
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        relative = os.path.relpath(full_path, self._root)
+        response.headers["Cache-Control"] = self.cache_control(relative)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or not self._wants_fallback(path):
+                raise
+        full_path, stat_result = self.lookup_path(self.spa_fallback)
+        if stat_result is None:
+            raise HTTPException(status_code=404)
+        return self.file_response(full_path, stat_result, scope)
+
+    def _wants_fallback(self, path: str) -> bool:
+        if not self.spa_fallback:
+            return False
+        path = path.replace(os.sep, "/")
+        if path.startswith(self.fallback_exclude):
+            return False
+        # Missing assets (anything with an extension) stay 404
+        return "." not in path.rsplit("/", 1)[-1]
@@ -0,0 +1,45 @@
+# app/utils/uploads.py
+#
+# Caps the request body of upload endpoints before the app reads it. FastAPI
+# parses a multipart body in full (into a spooled temp file) before the handler
+# runs, so a size check in the handler comes after the I/O. Here:
+#   - a Content-Length above the cap is answered 413 without reading the body;
+#   - a chunked body (no Content-Length) is counted as it is received, and
+#     parsing stops with 413 as soon as it passes the cap.
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, max_bytes: int, path_suffixes: tuple, detail: str = "Upload too large"):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_suffixes = path_suffixes
+        self.detail = detail
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].rstrip("/").endswith(self.path_suffixes):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": self.detail}, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises an HTTPException from body parsing as is
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,106 @@
+# benchmarks/history_serialization.py
+#
+# Serialization time and bytes on the wire for the payload of
+# GET /api/conversations/history/{user_id} (all sessions), before and after
+# switching to plain dicts + orjson + gzip/brotli.
+#
+#   cd backend && python -m benchmarks.history_serialization --sessions 50 --messages 200
+#
+# "before" is what the endpoint did previously: ORM objects through
+# jsonable_encoder and the stdlib JSONResponse. No database is needed; the
+# rows are transient ORM objects.
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models import user, conversation, lesson, job  # noqa: F401  (register all mappers)
+from app.models.conversation import ConversationHistory
+from app.services.conversation_service import message_to_dict
+from app.utils.responses import FastJSONResponse
+from app.utils import compression
+
+SAMPLE_TEXT = (
+    "Hola! Hoy vamos a practicar el pretérito perfecto. ¿Qué has hecho esta semana? "
+    "Try to answer with at least two sentences, and don't worry about mistakes. "
+)
+
+
+def build_payload(sessions: int, messages: int):
+    start = datetime(2026, 1, 1)
+    data = []
+    message_id = 0
+    for session_id in range(1, sessions + 1):
+        rows = []
+        for i in range(messages):
+            message_id += 1
+            rows.append(ConversationHistory(
+                id=message_id,
+                user_id=1,
+                chat_session_id=session_id,
+                role="user" if i % 2 == 0 else "assistant",
+                message=SAMPLE_TEXT * (1 + i % 4),
+                timestamp=start + timedelta(minutes=message_id),
+            ))
+        data.append({
+            "chat_session_id": session_id,
+            "session_name": f"Session {session_id}",
+            "created_at": start + timedelta(days=session_id),
+            "messages": rows,
+        })
+    return data
+
+
+def before(payload) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def after(payload) -> bytes:
+    return FastJSONResponse([
+        {**session, "messages": [message_to_dict(m) for m in session["messages"]]}
+        for session in payload
+    ]).body
+
+
+def timed(fn, payload, repeat: int):
+    samples = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(payload)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = build_payload(args.sessions, args.messages)
+    before_ms, before_body = timed(before, payload, args.repeat)
+    after_ms, after_body = timed(after, payload, args.repeat)
+
+    print(f"{args.sessions} sessions x {args.messages} messages, median of {args.repeat} runs")
+    print(f"  serialize  before (jsonable_encoder + json): {before_ms:9.2f} ms")
+    print(f"  serialize  after  (dicts + orjson):          {after_ms:9.2f} ms  ({before_ms / after_ms:.1f}x)")
+    print(f"  identity body:  {len(before_body):>10,} bytes (before)  {len(after_body):>10,} bytes (after)")
+    codings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    for coding in codings:
+        started = time.perf_counter()
+        compressed = compression.compress(after_body, coding)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"  {coding:<5} body:  {len(compressed):>10,} bytes ({len(compressed) / len(after_body):.1%}) in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
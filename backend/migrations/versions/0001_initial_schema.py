@@ -0,0 +1,66 @@
+"""initial schema (tables previously created by Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("language_level", sa.String(), nullable=True),
+        sa.Column("preferred_language", sa.String()),
+        sa.Column("is_admin", sa.Boolean()),
+        sa.Column("experience_points", sa.Integer()),
+        sa.Column("current_level", sa.String()),
+        sa.Column("display_name", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("bio", sa.String(), nullable=True),
+        sa.Column("interface_language", sa.String()),
+        sa.Column("timezone", sa.String(), nullable=True),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+        sa.Column("total_sessions", sa.Integer()),
+        sa.Column("total_messages", sa.Integer()),
+        sa.Column("is_banned", sa.Boolean()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+
+    op.create_table(
+        "conversation_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("chat_session_id", sa.Integer(), sa.ForeignKey("chat_sessions.id")),
+        sa.Column("role", sa.String()),
+        sa.Column("message", sa.Text()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_conversation_history_id", "conversation_history", ["id"])
+
+
+def downgrade():
+    op.drop_table("conversation_history")
+    op.drop_table("chat_sessions")
+    op.drop_table("users")
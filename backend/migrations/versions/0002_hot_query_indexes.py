@@ -0,0 +1,34 @@
+"""composite and foreign-key indexes for history and session-list queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # History reads: WHERE user_id = ? AND chat_session_id = ? ORDER BY timestamp, id
+    ("ix_conversation_history_user_session_ts", "conversation_history", ["user_id", "chat_session_id", "timestamp", "id"]),
+    # FK index for joins/deletes by session
+    ("ix_conversation_history_chat_session_id", "conversation_history", ["chat_session_id"]),
+    # Session lists: WHERE user_id = ? ORDER BY created_at (also serves the user_id FK)
+    ("ix_chat_sessions_user_created", "chat_sessions", ["user_id", "created_at", "id"]),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while Postgres builds the indexes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,41 @@
+"""background job queue and chat session title status
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "background_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_background_jobs_id", "background_jobs", ["id"])
+    op.create_index("ix_background_jobs_status_run_after", "background_jobs", ["status", "run_after"])
+
+    # Existing sessions keep whatever title they have
+    op.add_column("chat_sessions", sa.Column("title_status", sa.String(), nullable=False, server_default="ready"))
+
+
+def downgrade():
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.drop_column("title_status")
+    op.drop_table("background_jobs")
@@ -0,0 +1,97 @@
+"""lesson catalog tables, seeded with the sample lessons
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# The lessons previously hardcoded in app/api/lesson_routes.py
+SAMPLE_LESSONS = [
+    {
+        "id": 1,
+        "title": "Coffee Shop Conversation",
+        "description": "Practice ordering coffee and having a casual conversation at a coffee shop",
+        "type": "SCENARIO",
+        "content": {
+            "scenario": "You're at a coffee shop. The barista greets you.",
+            "bot_role": "barista",
+            "initial_message": "Hi there! Welcome to our coffee shop. What can I get for you today?",
+            "feedback_after_messages": 5
+        },
+    },
+    {
+        "id": 2,
+        "title": "Basic Grammar Quiz",
+        "description": "Test your knowledge of basic grammar rules",
+        "type": "QUIZ",
+        "content": None,
+    },
+    {
+        "id": 3,
+        "title": "Vocabulary Quiz",
+        "description": "Test your knowledge of common vocabulary",
+        "type": "QUIZ",
+        "content": None,
+    },
+]
+
+SAMPLE_QUESTIONS = [
+    (2, 1, "Which sentence is grammatically correct?",
+     ["I am going to the store yesterday", "I went to the store yesterday",
+      "I going to the store yesterday", "I goes to the store yesterday"],
+     "I went to the store yesterday"),
+    (2, 2, "Choose the correct article: ___ apple is red.", ["a", "an", "the", "none"], "an"),
+    (2, 3, "Which is the correct past tense of 'go'?", ["goed", "went", "gone", "going"], "went"),
+    (3, 1, "What is the opposite of 'hot'?", ["warm", "cold", "cool", "freezing"], "cold"),
+    (3, 2, "Which word means 'very happy'?", ["sad", "angry", "delighted", "tired"], "delighted"),
+    (3, 3, "What is a synonym for 'big'?", ["small", "tiny", "huge", "little"], "huge"),
+]
+
+
+def upgrade():
+    lessons = op.create_table(
+        "lessons",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("type", sa.Enum("SCENARIO", "QUIZ", name="lessontype"), nullable=False),
+        sa.Column("context", sa.Text(), nullable=True),
+        sa.Column("content", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_lessons_id", "lessons", ["id"])
+
+    questions = op.create_table(
+        "quiz_questions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("options", sa.JSON(), nullable=False),
+        sa.Column("correct_answer", sa.String(), nullable=False),
+        sa.UniqueConstraint("lesson_id", "position", name="uq_quiz_questions_lesson_position"),
+    )
+    op.create_index("ix_quiz_questions_id", "quiz_questions", ["id"])
+
+    op.bulk_insert(lessons, SAMPLE_LESSONS)
+    op.bulk_insert(questions, [
+        {"lesson_id": lesson_id, "position": position, "question": question,
+         "options": options, "correct_answer": correct_answer}
+        for lesson_id, position, question, options, correct_answer in SAMPLE_QUESTIONS
+    ])
+    # Explicit ids were inserted above; move the Postgres sequence past them
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("SELECT setval(pg_get_serial_sequence('lessons', 'id'), (SELECT MAX(id) FROM lessons))")
+
+
+def downgrade():
+    op.drop_table("quiz_questions")
+    op.drop_table("lessons")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS lessontype")
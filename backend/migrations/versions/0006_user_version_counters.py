@@ -0,0 +1,24 @@
+"""version counters for conditional GETs on users and their session lists
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("row_version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("users", sa.Column("sessions_version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("sessions_version")
+        batch_op.drop_column("row_version")
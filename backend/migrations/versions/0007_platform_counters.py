@@ -0,0 +1,33 @@
+"""platform counters, seeded with the current totals
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "platform_counters",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.String(), primary_key=True),
+        sa.Column("slot", sa.Integer(), primary_key=True),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+    )
+    # One last full count; from here on the write paths keep the totals
+    for name, table in (("users", "users"), ("chat_sessions", "chat_sessions"), ("messages", "conversation_history")):
+        op.execute(
+            f"INSERT INTO platform_counters (name, bucket, slot, value) "
+            f"SELECT '{name}', 'all', 0, COUNT(*) FROM {table}"
+        )
+
+
+def downgrade():
+    op.drop_table("platform_counters")
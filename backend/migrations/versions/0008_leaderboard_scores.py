@@ -0,0 +1,58 @@
+"""leaderboard scores
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "leaderboard_scores",
+        sa.Column("board", sa.String(), primary_key=True),
+        sa.Column("period", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_leaderboard_scores_updated_at", "leaderboard_scores", ["updated_at"])
+
+    # Seed from the source tables; afterwards the write paths keep scores current.
+    # Weekly/monthly XP can't be derived from existing data and starts at zero.
+    now = datetime.utcnow()
+    iso_year, iso_week, iso_weekday = now.isocalendar()
+    week_start = datetime(now.year, now.month, now.day) - timedelta(days=iso_weekday - 1)
+    month_start = datetime(now.year, now.month, 1)
+    bind = op.get_bind()
+    for period, since in (
+        ("all", None),
+        (f"week:{iso_year}-W{iso_week:02d}", week_start),
+        (f"month:{now:%Y-%m}", month_start),
+    ):
+        bind.execute(
+            sa.text(
+                "INSERT INTO leaderboard_scores (board, period, user_id, score, updated_at) "
+                "SELECT 'messages', :period, user_id, COUNT(*), :now FROM conversation_history "
+                "WHERE user_id IS NOT NULL" + (" AND timestamp >= :since" if since else "") + " GROUP BY user_id"
+            ),
+            {"period": period, "now": now, **({"since": since} if since else {})},
+        )
+    bind.execute(
+        sa.text(
+            "INSERT INTO leaderboard_scores (board, period, user_id, score, updated_at) "
+            "SELECT 'xp', 'all', id, experience_points, :now FROM users WHERE experience_points > 0"
+        ),
+        {"now": now},
+    )
+
+
+def downgrade():
+    op.drop_table("leaderboard_scores")
@@ -0,0 +1,42 @@
+"""append-only XP ledger, opened with each user's current balance
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "xp_ledger",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("balance_after", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_xp_ledger_user_id_created_at", "xp_ledger", ["user_id", "created_at"])
+    op.create_index("ix_xp_ledger_created_at", "xp_ledger", ["created_at"])
+
+    # XP earned before the ledger existed is booked as one opening entry per user
+    op.get_bind().execute(
+        sa.text(
+            "INSERT INTO xp_ledger (user_id, delta, balance_after, reason, created_at) "
+            "SELECT id, experience_points, experience_points, 'opening_balance', :now "
+            "FROM users WHERE experience_points > 0"
+        ),
+        {"now": datetime.utcnow()},
+    )
+
+
+def downgrade():
+    op.drop_table("xp_ledger")
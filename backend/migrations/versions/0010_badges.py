@@ -0,0 +1,49 @@
+"""badges and user_badges, seeded with the default badges
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+# Same list as DEFAULT_BADGES in app/services/badges.py
+DEFAULT_BADGES = [
+    {"name": "First 100 XP", "description": "You reached 100 XP!", "icon": "🏅", "rule_type": "xp", "threshold": 100},
+    {"name": "Chatterbox", "description": "You’ve sent 50 messages!", "icon": "💬", "rule_type": "messages", "threshold": 50},
+    {"name": "Level Up!", "description": "You reached your first new level!", "icon": "📈", "rule_type": "xp", "threshold": 100},
+    {"name": "On a Roll", "description": "You practised 3 days in a row!", "icon": "🔥", "rule_type": "streak", "threshold": 3},
+    {"name": "Week Warrior", "description": "You practised 7 days in a row!", "icon": "🗓️", "rule_type": "streak", "threshold": 7},
+]
+
+
+def upgrade():
+    badges = op.create_table(
+        "badges",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("icon", sa.String(), nullable=True),
+        sa.Column("rule_type", sa.String(), nullable=False),
+        sa.Column("threshold", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "user_badges",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("badge_id", sa.Integer(), sa.ForeignKey("badges.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("awarded_at", sa.DateTime(), nullable=False),
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(badges, [{**badge, "created_at": now} for badge in DEFAULT_BADGES])
+
+
+def downgrade():
+    op.drop_table("user_badges")
+    op.drop_table("badges")
@@ -0,0 +1,74 @@
+"""ON DELETE CASCADE for sessions and messages, pending-deletion markers
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ("chat_sessions", "user_id", "users"),
+    ("conversation_history", "user_id", "users"),
+    ("conversation_history", "chat_session_id", "chat_sessions"),
+]
+
+# Gives the unnamed SQLite constraints a name that batch mode can drop
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _fk_name(table: str, column: str) -> str:
+    # Postgres default name for the constraints created by 0001; the new ones reuse it
+    return f"{table}_{column}_fkey"
+
+
+def _existing_fk_name(table: str, column: str, referred: str) -> str:
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk["constrained_columns"] == [column] and fk["name"]:
+            return fk["name"]
+    # Unnamed (SQLite): the batch naming convention applies
+    return f"fk_{table}_{column}_{referred}"
+
+
+def _replace_foreign_keys(ondelete):
+    if op.get_bind().dialect.name == "postgresql":
+        # conversation_history is the largest table: swap the constraints NOT VALID (no scan,
+        # brief lock), then validate them outside the transaction while writes continue
+        for table, column, referred in FOREIGN_KEYS:
+            op.drop_constraint(_existing_fk_name(table, column, referred), table, type_="foreignkey")
+            op.create_foreign_key(
+                _fk_name(table, column), table, referred, [column], ["id"], ondelete=ondelete, postgresql_not_valid=True
+            )
+        with op.get_context().autocommit_block():
+            for table, column, _ in FOREIGN_KEYS:
+                op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_fk_name(table, column)}")
+        return
+
+    # SQLite can't alter constraints; batch mode copies the table
+    for table in ("chat_sessions", "conversation_history"):
+        foreign_keys = [(column, referred) for fk_table, column, referred in FOREIGN_KEYS if fk_table == table]
+        existing = {column: _existing_fk_name(table, column, referred) for column, referred in foreign_keys}
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in foreign_keys:
+                batch_op.drop_constraint(existing[column], type_="foreignkey")
+                batch_op.create_foreign_key(_fk_name(table, column), referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    op.add_column("chat_sessions", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.add_column("users", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    _replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("deleted_at")
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.drop_column("deleted_at")
+    _replace_foreign_keys(None)
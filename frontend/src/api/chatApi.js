@@ -56,3 +56,19 @@ export const fetchConversationHistory = async (user_id, chat_session_id = null)
   });
   return res.data;
 };
+
+// Fetch one page of sessions (newest first), each with its first page of messages
+export const fetchConversationHistoryPage = async (user_id, { cursor = null, limit = 10, messages_limit = 20 } = {}) => {
+  const res = await axios.get(`/conversations/history/${user_id}/page`, {
+    params: { limit, messages_limit, ...(cursor ? { cursor } : {}) },
+  });
+  return res.data;
+};
+
+// Fetch the next page of messages of one session
+export const fetchSessionMessagesPage = async (user_id, chat_session_id, { cursor = null, limit = 50 } = {}) => {
+  const res = await axios.get(`/conversations/history/${user_id}/sessions/${chat_session_id}`, {
+    params: { limit, ...(cursor ? { cursor } : {}) },
+  });
+  return res.data;
+};